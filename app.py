@@ -1,16 +1,30 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 import requests
 from flask_cors import CORS
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from datetime import datetime, timedelta
 import logging
+import contextvars
+import hashlib
+import json
 import os
+import random
 import re
+import sqlite3
+import sys
 import unicodedata
+import weakref
+from array import array
+from collections import Counter
+from contextlib import contextmanager
 from difflib import SequenceMatcher
-from functools import lru_cache
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
 app = Flask(__name__)
 CORS(app)
@@ -20,7 +34,9 @@ logger = logging.getLogger(__name__)
 
 # Clé API TMDB
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', '8d8890d0c3bb35e59b72e11b119e951f')
-TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+TMDB_BASE_URL = os.getenv('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+# Surchargeable pour pointer vers un serveur amont simulé (mock_upstream.py)
+ALLOCINE_BASE_URL = os.getenv('ALLOCINE_BASE_URL', 'https://www.allocine.fr')
 
 # IDs des cinémas Allociné pour Paris (ordre préféré)
 CINEMA_IDS = {
@@ -41,14 +57,1095 @@ CINEMA_IDS = {
     'Le Louxor': 'W7510',
 }
 
+# Pool de connexions dimensionné pour les threads de scraping, pages et TMDB
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 24))
+HTTP_CONNECT_TIMEOUT = 3.05
+# Retries (GET idempotents) : erreurs réseau et réponses 5xx, backoff exponentiel avec jitter
+HTTP_MAX_RETRIES = 2
+HTTP_RETRY_BACKOFF_SECONDS = 0.3
+HTTP_RETRY_STATUSES = {500, 502, 503, 504}
+# Disjoncteur par hôte : ouvert après N échecs consécutifs, une requête d'essai après le délai
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30
+# Limiteur adaptatif par hôte : (débit max en requêtes/s, concurrence max)
+HOST_LIMITS = {
+    urlsplit(TMDB_BASE_URL).netloc: (40.0, 16),
+    urlsplit(ALLOCINE_BASE_URL).netloc: (20.0, 12),
+}
+DEFAULT_HOST_LIMIT = (10.0, 8)
+# Attente maximale d'un créneau du limiteur, et d'un Retry-After avant de réessayer
+HTTP_LIMIT_WAIT_SECONDS = 15
+HTTP_MAX_RETRY_AFTER_SECONDS = 10
+
 SESSION = requests.Session()
+SESSION_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+SESSION.mount('https://', SESSION_ADAPTER)
+SESSION.mount('http://', SESSION_ADAPTER)
 SESSION_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
 }
 
-# Simple in-memory cache for daily showtimes
-SHOWTIMES_CACHE = {}
+# Appels amont : 'live' (réseau), 'record' (réseau + fixtures) ou 'replay' (fixtures seulement)
+HTTP_MODE = os.getenv('SEANCES_HTTP_MODE', 'live')
+HTTP_FIXTURES_DIR = os.getenv(
+    'SEANCES_FIXTURES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'http'),
+)
+
+# Fallback HTML : lxml si installé (plus rapide), sinon le parser de la stdlib
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = os.getenv('HTML_PARSER', 'lxml')
+except ImportError:
+    HTML_PARSER = os.getenv('HTML_PARSER', 'html.parser')
+
+def has_movie_card_class(value):
+    # Pendant le parsing, l'attribut class peut arriver brut ("card movie-card-theater cf")
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return 'movie-card-theater' in classes
+
+MOVIE_CARD_STRAINER = SoupStrainer('div', class_=has_movie_card_class)
+ALLOCINE_TIME_PATTERN = re.compile(r'\b(\d{1,2})[:h](\d{2})\b')
+ALLOCINE_FILM_ID_PATTERN = re.compile(r'cfilm=(\d+)')
+
+# Affiches Allociné : clés directes, puis chemin appris par forme de réponse
+POSTER_DIRECT_KEYS = ("poster", "picture", "thumbnail", "image", "cover")
+POSTER_URL_KEYS = ("url", "href", "src", "path", "filePath", "filename")
+POSTER_KEY_HINTS = ("poster", "image", "picture", "cover", "thumb")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+_POSTER_KEY_PATHS = {}
+POSTER_KEY_PATHS_MAX = 256
+
+# Cache persistant (SQLite) des réponses HTTP et des résultats TMDB ; vide = cache en mémoire
+CACHE_PATH = os.getenv(
+    'SEANCES_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.seances_cache.sqlite3'),
+)
+ALLOCINE_HTTP_TTL_SECONDS = 10 * 60
+TMDB_SEARCH_HTTP_TTL_SECONDS = 24 * 60 * 60
+TMDB_DETAILS_HTTP_TTL_SECONDS = 7 * 24 * 60 * 60
+# Résultats de search_movie_tmdb : film trouvé, aucun match, erreur transitoire
+TMDB_MATCH_TTL_SECONDS = 30 * 24 * 60 * 60
+TMDB_NO_MATCH_TTL_SECONDS = 3 * 24 * 60 * 60
+TMDB_ERROR_TTL_SECONDS = 60
+# Index local des films résolus (titres normalisés -> tmdb_id), consulté avant la recherche TMDB
+TITLE_INDEX_TTL_SECONDS = 180 * 24 * 60 * 60
+TITLE_INDEX_CANDIDATES = 20
+TITLE_INDEX_MIN_SCORE = 0.9
+# Chiffres romains des suites (ii -> 2...) comparés par l'index
+ROMAN_NUMERALS = ('i', 'ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x', 'xi', 'xii')
+# Correspondance ID film Allociné -> tmdb_id, établie au premier match réussi
+ALLOCINE_TMDB_TTL_SECONDS = 365 * 24 * 60 * 60
+# Films extraits d'une page Allociné, par empreinte du corps brut (une page inchangée n'est pas re-parsée)
+PARSED_LISTING_TTL_SECONDS = 24 * 60 * 60
+# Les entrées expirées sont gardées un jour avant d'être purgées
+CACHE_PURGE_GRACE_SECONDS = 24 * 60 * 60
+CACHE_PURGE_INTERVAL_SECONDS = 60 * 60
+
+# Horaires par (cinema_id, date), partagés entre workers via le cache persistant (voir SharedShowtimesCache)
 SHOWTIMES_TTL_SECONDS = 15 * 60  # 15 minutes
+# Cinéma sans réponse et sans entrée précédente : liste vide gardée brièvement
+SHOWTIMES_ERROR_TTL_SECONDS = 60
+# Au-delà de cet âge, une entrée périmée n'est plus servie en attendant le rafraîchissement
+SHOWTIMES_STALE_MAX_SECONDS = int(os.getenv('SHOWTIMES_STALE_MAX_SECONDS', 6 * 60 * 60))
+# Bail de scrape d'un (cinéma, date) : un seul worker scrape, les autres attendent son résultat
+SCRAPE_LEASE_SECONDS = 120
+# Attente d'un scrape tenu ailleurs : relecture du cache partagé, intervalle doublé jusqu'au plafond
+SCRAPE_LEASE_POLL_SECONDS = 0.1
+SCRAPE_LEASE_POLL_MAX_SECONDS = 2.0
+
+# Pré-chauffage en arrière-plan : aujourd'hui -> aujourd'hui+6 (les 7 jours de getNextDays côté PWA)
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1') == '1'
+PREWARM_DAYS = 7
+PREWARM_INTERVAL_SECONDS = int(os.getenv('PREWARM_INTERVAL_SECONDS', 60))
+
+# Pool partagé pour le scraping des cinémas (au lieu d'un pool par requête)
+SCRAPE_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix='scrape')
+
+# Pages 2..N des réponses JSON Allociné, récupérées en parallèle
+PAGE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='allocine-page')
+
+# Source Allociné par cinéma : JSON, ou page HTML (horaires du jour seulement) si le JSON ne donne rien
+ALLOCINE_SOURCES = ('json', 'html')
+SOURCE_HEALTH_TTL_SECONDS = 30 * 24 * 60 * 60
+# Cinéma routé vers l'HTML : le JSON est retenté (en course avec l'HTML) après ce délai
+SOURCE_REPROBE_SECONDS = 30 * 60
+# Sources interrogées en parallèle quand la bonne n'est pas connue
+SOURCE_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix='allocine-source')
+
+# Recherches TMDB, partagées entre tous les cinémas en cours de scraping
+ENRICH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='tmdb')
+
+# Rafraîchissements en arrière-plan (stale-while-revalidate + pré-chauffage)
+REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='refresh')
+_REFRESHING = set()
+_REFRESHING_LOCK = threading.Lock()
+_PREWARM_STARTED = False
+_LAST_CACHE_PURGE = 0.0
+_PREWARM_LOCK = threading.Lock()
+
+# Buckets des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_metric_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+def format_metric_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Métrique au format texte Prometheus, avec étiquettes (valeurs par processus)."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def values_by(self, label):
+        """Somme des valeurs regroupées par une étiquette."""
+        index = self.labels.index(label)
+        totals = Counter()
+        with self._lock:
+            for key, value in self._values.items():
+                totals[key[index]] += value
+        return dict(totals)
+
+    def total(self):
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{format_metric_labels(self.labels, key, extra)} {format_metric_value(value)}")
+        return '\n'.join(lines)
+
+class MetricCounter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class MetricGauge(Metric):
+    """Jauge ; avec function, la valeur est lue au moment de l'export ({étiquettes: valeur} ou nombre)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), function=None):
+        super().__init__(name, help_text, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        current = self.function()
+        if not isinstance(current, dict):
+            return [(self.name, (), (), current)]
+        return [
+            (self.name, key if isinstance(key, tuple) else (key,), (), value)
+            for key, value in sorted(current.items())
+        ]
+
+class MetricHistogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def value(self, **labels):
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series['count'] if series else 0
+
+    def total(self):
+        with self._lock:
+            return sum(series['count'] for series in self._values.values())
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key, (('le', format_metric_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, (), series['sum']))
+                samples.append((f"{self.name}_count", key, (), series['count']))
+        return samples
+
+METRICS = []
+
+UPSTREAM_REQUESTS = MetricCounter(
+    'seances_upstream_requests_total', "Appels amont (réseau ou rejeu) par hôte et statut HTTP", ('host', 'status'))
+UPSTREAM_LATENCY = MetricHistogram(
+    'seances_upstream_request_seconds', "Durée des appels amont par hôte", ('host',))
+HTTP_CACHE_LOOKUPS = MetricCounter(
+    'seances_http_cache_total',
+    "Cache des réponses amont : hit, miss, revalidated (304), stale (expirée servie sur erreur)", ('result',))
+SHOWTIMES_CACHE_LOOKUPS = MetricCounter(
+    'seances_showtimes_cache_total', "SHOWTIMES_CACHE par (cinéma, date) : hit, stale, miss", ('result',))
+SHOWTIMES_CACHE_EVICTIONS = MetricCounter(
+    'seances_showtimes_cache_evictions_total', "Entrées de dates passées retirées de SHOWTIMES_CACHE")
+TMDB_LOOKUPS = MetricCounter(
+    'seances_tmdb_lookups_total',
+    "search_movie_tmdb par source (crosswalk, match_cache, title_index, search) et résultat", ('source', 'result'))
+CINEMA_SCRAPE_LATENCY = MetricHistogram(
+    'seances_cinema_scrape_seconds', "Durée du scrape Allociné d'un cinéma (toutes pages, fallback compris)", ('cinema',))
+ALLOCINE_ROUTES = MetricCounter(
+    'seances_allocine_route_total', "Source choisie pour les horaires du jour (json, html, race)", ('cinema', 'route'))
+ALLOCINE_FALLBACKS = MetricCounter(
+    'seances_allocine_fallback_total', "Recours à l'autre source après une source sans films", ('cinema', 'source', 'result'))
+LISTING_REUSES = MetricCounter(
+    'seances_listing_reuse_total',
+    "Travail évité sur contenu inchangé : parse (page déjà vue), enrich (programme identique)", ('stage',))
+CINEMA_SCRAPE_FAILURES = MetricCounter(
+    'seances_cinema_scrape_failures_total', "Scrapes sans aucune source disponible, par cinéma", ('cinema',))
+# Jauges lues à l'export
+CIRCUIT_STATE_VALUES = {'closed': 0, 'half-open': 1, 'open': 2}
+MetricGauge('seances_scrapes_in_flight', "Scrapes Allociné en cours (SCRAPE_FLIGHT)",
+            function=lambda: SCRAPE_FLIGHT.count())
+MetricGauge('seances_tmdb_lookups_in_flight', "Recherches TMDB en cours (TMDB_FLIGHT)",
+            function=lambda: TMDB_FLIGHT.count())
+MetricGauge('seances_refresh_pending', "(cinéma, date) en attente de rafraîchissement en arrière-plan",
+            function=lambda: len(_REFRESHING))
+MetricGauge('seances_showtimes_cache_entries', "Entrées dans la copie locale de SHOWTIMES_CACHE",
+            function=lambda: len(SHOWTIMES_CACHE))
+MetricGauge('seances_circuit_state', "État du disjoncteur par hôte (0 fermé, 1 semi-ouvert, 2 ouvert)", ('host',),
+            function=lambda: {host: CIRCUIT_STATE_VALUES[b.state] for host, b in list(CIRCUIT_BREAKERS.items())})
+MetricGauge('seances_host_in_flight', "Requêtes en cours par hôte amont", ('host',),
+            function=lambda: {host: limiter.in_flight for host, limiter in list(HOST_LIMITERS.items())})
+MetricGauge('seances_host_concurrency_limit', "Concurrence autorisée par le limiteur AIMD", ('host',),
+            function=lambda: {host: int(limiter.concurrency) for host, limiter in list(HOST_LIMITERS.items())})
+MetricGauge('seances_host_rate_limit', "Débit autorisé par le limiteur (req/s)", ('host',),
+            function=lambda: {host: limiter.rate for host, limiter in list(HOST_LIMITERS.items())})
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+# Étapes mesurées pour l'en-tête Server-Timing (durées cumulées sur tous les threads de la requête)
+SERVER_TIMING_STAGES = {
+    'scrape': "Scrape Allocine par cinema",
+    'allocine-json': "Allocine JSON (pages)",
+    'allocine-html': "Allocine HTML (fallback)",
+    'enrich': "Attente enrichissement TMDB",
+    'tmdb-search': "TMDB recherche",
+    'tmdb-details': "TMDB details",
+    'serialize': "Serialisation JSON",
+}
+TIMED_ENDPOINTS = {'get_showtimes', 'get_showtimes_range'}
+
+class RequestTiming:
+    """Durées cumulées par étape pour une requête, au total et par cinéma."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.cinemas = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, elapsed, cinema_id=None):
+        with self._lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+            if cinema_id:
+                per_cinema = self.cinemas.setdefault(cinema_id, {})
+                per_cinema[stage] = per_cinema.get(stage, 0.0) + elapsed
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self):
+        with self._lock:
+            parts = [
+                f'{stage};dur={self.stages[stage][0] * 1000:.1f};desc="{desc} x{self.stages[stage][1]}"'
+                for stage, desc in SERVER_TIMING_STAGES.items() if stage in self.stages
+            ]
+        parts.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(parts)
+
+    def as_dict(self):
+        names_by_id = {cinema_id: name for name, cinema_id in CINEMA_IDS.items()}
+        with self._lock:
+            return {
+                'total_ms': round(self.elapsed_ms(), 1),
+                'stages': {
+                    stage: {'ms': round(duration * 1000, 1), 'count': count}
+                    for stage, (duration, count) in self.stages.items()
+                },
+                'cinemas': {
+                    names_by_id.get(cinema_id, cinema_id): {
+                        stage: round(duration * 1000, 1) for stage, duration in stages.items()
+                    }
+                    for cinema_id, stages in self.cinemas.items()
+                },
+            }
+
+# Mesures de la requête en cours, et cinéma auquel attribuer les étapes du thread courant
+REQUEST_TIMING = contextvars.ContextVar('request_timing', default=None)
+TIMING_CINEMA = contextvars.ContextVar('timing_cinema', default=None)
+
+@contextmanager
+def timed(stage):
+    """Ajoute la durée du bloc à l'étape stage de la requête en cours (sans effet hors requête)."""
+    timing = REQUEST_TIMING.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(stage, time.perf_counter() - start, TIMING_CINEMA.get())
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit en propageant le contexte courant (mesures de la requête) au worker."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+class PersistentCache:
+    """Cache clé/valeur JSON avec expiration, stocké dans SQLite (survit aux redémarrages)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._memory = {}
+        self._memory_leases = {}
+        self._memory_lock = threading.Lock()
+        if self.path:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5)
+                # WAL : les lectures des autres workers ne bloquent pas les écritures
+                conn.execute("PRAGMA journal_mode=WAL")
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS cache ("
+                        " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                        " stored_at REAL NOT NULL, expires_at REAL NOT NULL,"
+                        " PRIMARY KEY (namespace, key))"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS leases ("
+                        " name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Cache persistant indisponible ({self.path}), repli en mémoire: {e}")
+                self.path = None
+
+    def _conn(self):
+        # Une connexion par thread, ouverte après un éventuel fork gunicorn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, allow_expired=False):
+        """Retourne (value, stored_at, expires_at) ou None si absent (ou expiré)."""
+        if not self.path:
+            with self._memory_lock:
+                row = self._memory.get((namespace, key))
+            if row is None:
+                return None
+            value, stored_at, expires_at = row
+        else:
+            try:
+                row = self._conn().execute(
+                    "SELECT value, stored_at, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Lecture cache persistant impossible: {e}")
+                return None
+            if row is None:
+                return None
+            value, stored_at, expires_at = json.loads(row[0]), row[1], row[2]
+        if not allow_expired and expires_at <= time.time():
+            return None
+        return value, stored_at, expires_at
+
+    def set(self, namespace, key, value, ttl):
+        now = time.time()
+        if not self.path:
+            with self._memory_lock:
+                self._memory[(namespace, key)] = (value, now, now + ttl)
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, ensure_ascii=False), now, now + ttl),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture cache persistant impossible: {e}")
+
+    def items(self, namespace):
+        """Entrées non expirées d'un namespace : liste de (key, value)."""
+        now = time.time()
+        if not self.path:
+            with self._memory_lock:
+                return [(k[1], row[0]) for k, row in self._memory.items() if k[0] == namespace and row[2] > now]
+        try:
+            rows = self._conn().execute(
+                "SELECT key, value FROM cache WHERE namespace = ? AND expires_at > ?",
+                (namespace, now),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Lecture cache persistant impossible: {e}")
+            return []
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def touch(self, namespace, key, ttl, keep_stored_at=False):
+        """Prolonge une entrée existante de ttl secondes, comme si elle venait d'être écrite.
+
+        Avec keep_stored_at, seule l'échéance bouge : l'entrée garde son âge.
+        """
+        now = time.time()
+        if not self.path:
+            with self._memory_lock:
+                row = self._memory.get((namespace, key))
+                if row is not None:
+                    self._memory[(namespace, key)] = (row[0], row[1] if keep_stored_at else now, now + ttl)
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "UPDATE cache SET stored_at = CASE WHEN ? THEN stored_at ELSE ? END, expires_at = ?"
+                    " WHERE namespace = ? AND key = ?",
+                    (keep_stored_at, now, now + ttl, namespace, key),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture cache persistant impossible: {e}")
+
+    def purge_expired(self, grace=0):
+        """Supprime les entrées expirées depuis plus de grace secondes."""
+        now = time.time() - grace
+        if not self.path:
+            with self._memory_lock:
+                for cache_key in [k for k, row in self._memory.items() if row[2] <= now]:
+                    self._memory.pop(cache_key, None)
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f"Purge cache persistant impossible: {e}")
+
+    def try_lease(self, name, owner, ttl):
+        """Prend le bail name s'il est libre ou expiré ; True si owner le détient désormais."""
+        now = time.time()
+        if not self.path:
+            with self._memory_lock:
+                lease = self._memory_leases.get(name)
+                if lease is not None and lease[1] > now:
+                    return False
+                self._memory_leases[name] = (owner, now + ttl)
+                return True
+        try:
+            conn = self._conn()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+                    " WHERE leases.expires_at <= ?",
+                    (name, owner, now + ttl, now),
+                )
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            # Sans bail partagé, mieux vaut un scrape en double que pas de scrape
+            logger.warning(f"Bail {name} indisponible: {e}")
+            return True
+
+    def lease_expires_at(self, name):
+        """Échéance du bail name s'il est tenu, None s'il est libre ou expiré (lecture seule)."""
+        now = time.time()
+        if not self.path:
+            with self._memory_lock:
+                lease = self._memory_leases.get(name)
+            return lease[1] if lease is not None and lease[1] > now else None
+        try:
+            row = self._conn().execute("SELECT expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Lecture du bail {name} impossible: {e}")
+            return None
+        return row[0] if row is not None and row[0] > now else None
+
+    def release_lease(self, name, owner):
+        if not self.path:
+            with self._memory_lock:
+                if self._memory_leases.get(name, (None,))[0] == owner:
+                    self._memory_leases.pop(name, None)
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        except sqlite3.Error as e:
+            logger.warning(f"Libération du bail {name} impossible: {e}")
+
+PERSISTENT_CACHE = PersistentCache(CACHE_PATH)
+
+class SharedShowtimesCache:
+    """Horaires par (cinema_id, date) -> (fetched_at, expires_at, [MovieShowtimes]), partagés entre workers.
+
+    Chaque entrée est une ligne du cache persistant (namespace 'showtimes', forme pack_movies), remplacée d'un bloc :
+    un lecteur voit l'ancienne liste ou la nouvelle, jamais un mélange. Une copie locale évite
+    de relire SQLite tant qu'elle est fraîche.
+    """
+
+    namespace = 'showtimes'
+
+    def __init__(self, store):
+        self.store = store
+        self._local = {}
+        # Empreinte de la liste Allociné dont chaque entrée est issue (voir listing_fingerprint)
+        self._fingerprints = {}
+
+    @staticmethod
+    def store_key(pair):
+        return f"{pair[0]}|{pair[1]}"
+
+    def get(self, pair):
+        entry = self._local.get(pair)
+        if entry is not None and time.time() < entry[1]:
+            return entry
+        # Copie locale absente ou périmée : un autre worker a peut-être rafraîchi l'entrée
+        stored = self.store.get(self.namespace, self.store_key(pair), allow_expired=True)
+        if stored is not None and (entry is None or stored[1] > entry[0] or stored[2] > entry[1]):
+            movies = unpack_movies(stored[0])
+            if movies is not None:
+                entry = (stored[1], stored[2], movies)
+                self._local[pair] = entry
+                self._fingerprints[pair] = stored[0].get('fingerprint')
+        return entry
+
+    def put(self, pair, movies, ttl, fingerprint=None):
+        self.store.set(self.namespace, self.store_key(pair), dict(pack_movies(movies), fingerprint=fingerprint), ttl)
+        # Horodatée après l'écriture : la copie locale n'est pas plus ancienne que la ligne partagée
+        now = time.time()
+        self._local[pair] = (now, now + ttl, movies)
+        self._fingerprints[pair] = fingerprint
+
+    def reusable(self, pair, fingerprint):
+        """Films de l'entrée si elle vient de la même liste Allociné et que tous ont leurs infos TMDB."""
+        entry = self.get(pair)
+        if entry is None or fingerprint is None or self._fingerprints.get(pair) != fingerprint:
+            return None
+        if any(movie.film is None for movie in entry[2]):
+            # Des films sans TMDB (erreur passagère ?) : l'enrichissement est refait
+            return None
+        return entry[2]
+
+    def touch(self, pair, ttl, keep_stored_at=False):
+        """Prolonge l'entrée telle quelle (programme inchangé, ou scrape en échec avec keep_stored_at)."""
+        entry = self._local.get(pair)
+        if entry is None:
+            return
+        self.store.touch(self.namespace, self.store_key(pair), ttl, keep_stored_at)
+        now = time.time()
+        self._local[pair] = (entry[0] if keep_stored_at else now, now + ttl, entry[2])
+
+    def pop(self, pair, default=None):
+        self._fingerprints.pop(pair, None)
+        return self._local.pop(pair, default)
+
+    def keys(self):
+        return list(self._local.keys())
+
+    def clear(self):
+        """Vide la copie locale (les entrées partagées restent)."""
+        self._local.clear()
+        self._fingerprints.clear()
+
+    def __len__(self):
+        return len(self._local)
+
+SHOWTIMES_CACHE = SharedShowtimesCache(PERSISTENT_CACHE)
+
+class CachedResponse:
+    """Réponse HTTP relue depuis le cache persistant ou une fixture (sous-ensemble de requests.Response)."""
+
+    def __init__(self, url, status_code, text, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} pour {self.url}", response=self)
+
+class CircuitOpenError(requests.ConnectionError):
+    """Requête refusée sans appel réseau : le disjoncteur de l'hôte est ouvert."""
+
+class CircuitBreaker:
+    """Disjoncteur d'un hôte amont (fermé -> ouvert -> semi-ouvert)."""
+
+    def __init__(self, host, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if self._probing or time.time() - self.opened_at >= self.reset_seconds:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Semi-ouvert : une seule requête d'essai à la fois
+            if not self._probing and time.time() - self.opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """Requête d'essai terminée sans verdict (ni succès ni panne) : une autre pourra être tentée."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    logger.warning(f"Circuit ouvert pour {self.host} après {self.failures} échec(s)")
+                self.opened_at = time.time()
+            self._probing = False
+
+class RateLimitedError(requests.ConnectionError):
+    """Aucun créneau libre dans le limiteur de l'hôte avant l'échéance."""
+
+class HostLimiter:
+    """Limiteur adaptatif d'un hôte : seau à jetons (débit) et concurrence AIMD.
+
+    Chaque succès augmente doucement débit et concurrence jusqu'aux plafonds ; un 429
+    les divise par deux et bloque l'hôte pendant la durée du Retry-After.
+    """
+
+    def __init__(self, host, max_rate, max_concurrency):
+        self.host = host
+        self.max_rate = max_rate
+        self.min_rate = max(0.5, max_rate / 20)
+        self.rate = max_rate
+        self.tokens = max_rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self, timeout=HTTP_LIMIT_WAIT_SECONDS):
+        """Prend un créneau ; False si aucun ne peut se libérer avant timeout secondes.
+
+        Un blocage (Retry-After) ou un manque de jetons qui dépasse l'échéance échoue tout
+        de suite, sans attendre : l'appelant peut servir sa réponse en cache.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    if self.blocked_until >= deadline:
+                        return False
+                    wait = self.blocked_until - now
+                elif self.in_flight >= int(self.concurrency):
+                    wait = deadline - now
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                    if now + wait > deadline:
+                        return False
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return True
+                remaining = deadline - now
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(wait, remaining))
+
+    def release(self, outcome=None):
+        """outcome : 'ok' (augmentation additive), 'throttled' (réduction de moitié), None (neutre)."""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == 'ok':
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            elif outcome == 'throttled':
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, self.rate)
+            self._cond.notify_all()
+
+    def block(self, seconds):
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def parse_retry_after(value, default=1.0):
+    """Retry-After en secondes (nombre ou date HTTP)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+CIRCUIT_BREAKERS = {}
+_CIRCUIT_BREAKERS_LOCK = threading.Lock()
+HOST_LIMITERS = {}
+_HOST_LIMITERS_LOCK = threading.Lock()
+
+def host_limiter_for(url):
+    host = urlsplit(url).netloc
+    with _HOST_LIMITERS_LOCK:
+        limiter = HOST_LIMITERS.get(host)
+        if limiter is None:
+            max_rate, max_concurrency = HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT)
+            limiter = HOST_LIMITERS[host] = HostLimiter(host, max_rate, max_concurrency)
+        return limiter
+
+class SourceHealth:
+    """Résultat du dernier essai de chaque source Allociné pour un cinéma (persisté)."""
+
+    def __init__(self, cinema_id, state=None):
+        self.cinema_id = cinema_id
+        state = state or {}
+        self.produced = dict(state.get('produced') or {})
+        self.tried_at = dict(state.get('tried_at') or {})
+        self._lock = threading.Lock()
+
+    def route(self):
+        """'json', 'html' ou 'race' (les deux en parallèle) pour les horaires du jour."""
+        with self._lock:
+            if self.produced.get('json'):
+                return 'json'
+            if self.produced.get('html') and time.time() - self.tried_at.get('json', 0) < SOURCE_REPROBE_SECONDS:
+                return 'html'
+            # Santé inconnue, les deux sources en échec, ou JSON à re-sonder
+            return 'race'
+
+    def record(self, source, produced_data):
+        with self._lock:
+            self.produced[source] = produced_data
+            self.tried_at[source] = time.time()
+            state = {'produced': dict(self.produced), 'tried_at': dict(self.tried_at)}
+        PERSISTENT_CACHE.set('source_health', self.cinema_id, state, SOURCE_HEALTH_TTL_SECONDS)
+
+SOURCE_HEALTH = {}
+_SOURCE_HEALTH_LOCK = threading.Lock()
+
+def source_health_for(cinema_id):
+    with _SOURCE_HEALTH_LOCK:
+        health = SOURCE_HEALTH.get(cinema_id)
+        if health is None:
+            entry = PERSISTENT_CACHE.get('source_health', cinema_id)
+            health = SOURCE_HEALTH[cinema_id] = SourceHealth(cinema_id, entry[0] if entry else None)
+        return health
+
+def circuit_breaker_for(url):
+    host = urlsplit(url).netloc
+    with _CIRCUIT_BREAKERS_LOCK:
+        breaker = CIRCUIT_BREAKERS.get(host)
+        if breaker is None:
+            breaker = CIRCUIT_BREAKERS[host] = CircuitBreaker(host)
+        return breaker
+
+class HttpFixtures:
+    """Enregistrement / rejeu des réponses amont dans des fichiers JSON (un par requête)."""
+
+    KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, url, params=None):
+        digest = hashlib.sha1(http_cache_key(url, params).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def record(self, url, params, response):
+        os.makedirs(self.directory, exist_ok=True)
+        fixture = {
+            'url': url,
+            'params': {k: v for k, v in (params or {}).items() if k != 'api_key'},
+            'status_code': response.status_code,
+            'headers': {k: response.headers[k] for k in self.KEPT_HEADERS if k in response.headers},
+            'text': response.text,
+        }
+        with open(self.path_for(url, params), 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False)
+
+    def replay(self, url, params=None):
+        path = self.path_for(url, params)
+        try:
+            with open(path, encoding='utf-8') as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise requests.ConnectionError(f"Pas de fixture pour {url} ({path})")
+        return CachedResponse(fixture['url'], fixture['status_code'], fixture['text'], fixture.get('headers'))
+
+HTTP_FIXTURES = HttpFixtures(HTTP_FIXTURES_DIR)
+
+def session_get(url, params=None, timeout=10, headers=None):
+    """SESSION.get, avec enregistrement ou rejeu des réponses selon HTTP_MODE."""
+    host = urlsplit(url).netloc
+    status = 'error'
+    start = time.perf_counter()
+    try:
+        if HTTP_MODE == 'replay':
+            response = HTTP_FIXTURES.replay(url, params)
+        else:
+            response = SESSION.get(url, params=params, headers={**SESSION_HEADERS, **(headers or {})}, timeout=timeout)
+            if HTTP_MODE == 'record':
+                HTTP_FIXTURES.record(url, params, response)
+        status = response.status_code
+        return response
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, host=host)
+        UPSTREAM_REQUESTS.inc(host=host, status=status)
+
+def send_with_retries(url, params=None, timeout=10, headers=None):
+    """GET via SESSION avec limiteur par hôte et retries jitterés.
+
+    Échoue immédiatement si le circuit de l'hôte est ouvert ; un 429 bloque l'hôte
+    pendant le Retry-After puis la requête est réessayée.
+    """
+    breaker = circuit_breaker_for(url)
+    limiter = host_limiter_for(url)
+    connect_timeout = min(HTTP_CONNECT_TIMEOUT, timeout)
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if not limiter.acquire():
+            raise RateLimitedError(f"Limiteur saturé pour {limiter.host}")
+        # Créneau du limiteur toujours rendu, quelle que soit l'issue de la tentative
+        outcome = None
+        try:
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit ouvert pour {breaker.host}")
+            try:
+                response = session_get(url, params=params, timeout=(connect_timeout, timeout), headers=headers)
+            except requests.RequestException:
+                breaker.record_failure()
+                if attempt == HTTP_MAX_RETRIES:
+                    raise
+                response = None
+            except Exception:
+                # Erreur locale (fixture illisible...) : l'hôte n'y est pour rien, mais l'essai est rendu
+                breaker.release_probe()
+                raise
+            if response is not None:
+                if response.status_code == 429:
+                    # Throttling : ni succès ni panne pour le disjoncteur (l'essai éventuel est rendu)
+                    outcome = 'throttled'
+                    breaker.release_probe()
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    limiter.block(retry_after)
+                    logger.warning(f"429 de {limiter.host}, Retry-After {retry_after:.1f}s")
+                    if attempt == HTTP_MAX_RETRIES or retry_after > HTTP_MAX_RETRY_AFTER_SECONDS:
+                        return response
+                    continue
+                if response.status_code not in HTTP_RETRY_STATUSES:
+                    outcome = 'ok'
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                if attempt == HTTP_MAX_RETRIES:
+                    return response
+        finally:
+            limiter.release(outcome)
+        time.sleep(HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def http_cache_key(url, params=None):
+    # La clé API ne fait pas partie de l'identité de la requête
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k != 'api_key')
+    return json.dumps([url, items], ensure_ascii=False)
+
+def cached_response_from_entry(entry):
+    cached = entry[0]
+    return CachedResponse(cached['url'], cached['status_code'], cached['text'])
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since pour revalider une réponse en cache expirée."""
+    if entry is None or HTTP_MODE != 'live':
+        # Un 304 enregistré dans une fixture ne pourrait pas être rejoué
+        return None
+    headers = {}
+    if entry[0].get('etag'):
+        headers['If-None-Match'] = entry[0]['etag']
+    if entry[0].get('last_modified'):
+        headers['If-Modified-Since'] = entry[0]['last_modified']
+    return headers or None
+
+def http_get(url, params=None, timeout=10, cache_ttl=None):
+    """GET via SESSION ; les réponses 200 sont gardées cache_ttl secondes dans le cache persistant.
+
+    Une réponse expirée est revalidée par GET conditionnel (ETag / Last-Modified) : sur un 304,
+    elle est prolongée sans retélécharger le corps. Si l'hôte est en panne (circuit ouvert,
+    erreurs réseau ou 5xx après retries), elle est servie plutôt que rien.
+    """
+    cache_key = http_cache_key(url, params) if cache_ttl else None
+    entry = None
+    if cache_key:
+        entry = PERSISTENT_CACHE.get('http', cache_key, allow_expired=True)
+        if entry is not None and entry[2] > time.time():
+            HTTP_CACHE_LOOKUPS.inc(result='hit')
+            return cached_response_from_entry(entry)
+        HTTP_CACHE_LOOKUPS.inc(result='miss')
+
+    try:
+        response = send_with_retries(url, params=params, timeout=timeout, headers=conditional_headers(entry))
+    except requests.RequestException as exc:
+        if entry is None:
+            raise
+        logger.warning(f"{url} indisponible ({exc}), réponse en cache expirée servie")
+        HTTP_CACHE_LOOKUPS.inc(result='stale')
+        return cached_response_from_entry(entry)
+
+    if entry is not None and response.status_code == 304:
+        PERSISTENT_CACHE.touch('http', cache_key, cache_ttl)
+        HTTP_CACHE_LOOKUPS.inc(result='revalidated')
+        return cached_response_from_entry(entry)
+
+    if entry is not None and (response.status_code >= 500 or response.status_code == 429):
+        logger.warning(f"{url} en erreur {response.status_code}, réponse en cache expirée servie")
+        HTTP_CACHE_LOOKUPS.inc(result='stale')
+        return cached_response_from_entry(entry)
+
+    if cache_key and response.status_code == 200:
+        PERSISTENT_CACHE.set('http', cache_key, {
+            'url': url,
+            'status_code': response.status_code,
+            'text': response.text,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }, cache_ttl)
+    return response
+
+class SingleFlight:
+    """Regroupe les appels concurrents sur une même clé en une seule exécution."""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def count(self):
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+# Scrapes Allociné en cours par (cinema_id, date), recherches TMDB en cours par (titre, année)
+SCRAPE_FLIGHT = SingleFlight()
+TMDB_FLIGHT = SingleFlight()
 
 def normalize_key(value):
     value = value or ""
@@ -138,50 +1235,78 @@ def normalize_image_url(url):
         return f"https://www.allocine.fr{url}"
     return url
 
-def extract_allocine_poster_from_movie_data(movie_data):
-    """Extrait une URL d'affiche depuis la structure JSON Allociné."""
-    if not isinstance(movie_data, dict):
-        return None
-
-    direct_keys = ["poster", "picture", "thumbnail", "image", "cover"]
-    url_keys = ["url", "href", "src", "path", "filePath", "filename"]
+def looks_like_image_url(value):
+    lowered = value.lower()
+    return any(ext in lowered for ext in IMAGE_EXTENSIONS)
 
-    for key in direct_keys:
-        value = movie_data.get(key)
-        if isinstance(value, str) and any(ext in value.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-            return normalize_image_url(value)
-        if isinstance(value, dict):
-            for uk in url_keys:
-                uv = value.get(uk)
-                if isinstance(uv, str) and uv:
-                    return normalize_image_url(uv)
+def follow_key_path(node, path):
+    for step in path:
+        if isinstance(node, dict):
+            node = node.get(step)
+        elif isinstance(node, list) and isinstance(step, int) and step < len(node):
+            node = node[step]
+        else:
+            return None
+    return node
 
-    stack = [movie_data]
+def find_poster_key_path(movie_data):
+    """Parcours générique de la structure : chemin (clés/indices) de la première URL d'affiche."""
+    stack = [(movie_data, ())]
     seen = set()
     while stack:
-        node = stack.pop()
+        node, path = stack.pop()
         node_id = id(node)
         if node_id in seen:
             continue
         seen.add(node_id)
         if isinstance(node, dict):
             for k, v in node.items():
-                lk = str(k).lower()
                 if isinstance(v, str):
-                    if any(ext in v.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]) and any(
-                        hint in lk for hint in ["poster", "image", "picture", "cover", "thumb"]
-                    ):
-                        return normalize_image_url(v)
+                    lk = str(k).lower()
+                    if looks_like_image_url(v) and any(hint in lk for hint in POSTER_KEY_HINTS):
+                        return path + (k,)
                 elif isinstance(v, (dict, list)):
-                    stack.append(v)
+                    stack.append((v, path + (k,)))
         elif isinstance(node, list):
-            for item in node:
+            for index, item in enumerate(node):
                 if isinstance(item, (dict, list)):
-                    stack.append(item)
-                elif isinstance(item, str) and any(ext in item.lower() for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-                    return normalize_image_url(item)
+                    stack.append((item, path + (index,)))
+                elif isinstance(item, str) and looks_like_image_url(item):
+                    return path + (index,)
     return None
 
+def extract_allocine_poster_from_movie_data(movie_data):
+    """Extrait une URL d'affiche depuis la structure JSON Allociné."""
+    if not isinstance(movie_data, dict):
+        return None
+
+    for key in POSTER_DIRECT_KEYS:
+        value = movie_data.get(key)
+        if isinstance(value, str) and looks_like_image_url(value):
+            return normalize_image_url(value)
+        if isinstance(value, dict):
+            for uk in POSTER_URL_KEYS:
+                uv = value.get(uk)
+                if isinstance(uv, str) and uv:
+                    return normalize_image_url(uv)
+
+    # Chemin appris pour cette forme de réponse (mêmes clés de premier niveau)
+    shape = tuple(movie_data)
+    path = _POSTER_KEY_PATHS.get(shape)
+    if path is not None:
+        value = follow_key_path(movie_data, path)
+        if isinstance(value, str) and looks_like_image_url(value):
+            return normalize_image_url(value)
+
+    # Forme nouvelle ou modifiée : parcours complet, puis mémorisation du chemin
+    path = find_poster_key_path(movie_data)
+    if path is None:
+        return None
+    if len(_POSTER_KEY_PATHS) >= POSTER_KEY_PATHS_MAX:
+        _POSTER_KEY_PATHS.clear()
+    _POSTER_KEY_PATHS[shape] = path
+    return normalize_image_url(follow_key_path(movie_data, path))
+
 def pick_best_poster_path(details, movie_candidate=None):
     """Choisit une affiche en privilégiant l'anglais, puis l'original, puis le français."""
     if not isinstance(details, dict):
@@ -224,290 +1349,722 @@ def pick_best_poster_path(details, movie_candidate=None):
 
     return details.get('poster_path')
 
-@lru_cache(maxsize=512)
-def search_movie_tmdb(title, year_hint=None):
-    """Recherche un film sur TMDB et retourne ses infos"""
+def parse_year(value):
     try:
-        if not TMDB_API_KEY:
-            logger.warning("TMDB_API_KEY manquante, enrichissement désactivé.")
+        return int(str(value)[:4]) if value else None
+    except ValueError:
+        return None
+
+class TitleIndex:
+    """Index local des films déjà résolus : titre normalisé (+ année) -> tmdb_id.
+
+    Correspondance exacte sur les titres (français et original), puis approchée par
+    trigrammes pour les variantes proches, sans appel à /search/movie.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._films = {}
+        self._by_title = {}
+        self._by_trigram = {}
+
+    @staticmethod
+    def title_key(title):
+        return normalize_key(normalize_title(title or ''))
+
+    @staticmethod
+    def sequel_numbers(key):
+        """Numéros d'un titre normalisé ('saw iii' -> {3}, 'paranormal activity 2' -> {2})."""
+        numbers = set()
+        for token in key.replace('-', ' ').split():
+            if token.isdigit():
+                numbers.add(int(token))
+            elif token in ROMAN_NUMERALS:
+                numbers.add(ROMAN_NUMERALS.index(token) + 1)
+        return numbers
+
+    @staticmethod
+    def trigrams(key):
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for tmdb_id, film in self._store.items('title_index'):
+            self._insert(int(tmdb_id), film)
+
+    def _insert(self, tmdb_id, film):
+        self._films[tmdb_id] = film
+        for key in film['titles']:
+            self._by_title.setdefault(key, set()).add(tmdb_id)
+            for gram in self.trigrams(key):
+                self._by_trigram.setdefault(gram, set()).add(tmdb_id)
+
+    def add(self, tmdb_id, titles, year=None, original_language=None):
+        keys = {self.title_key(title) for title in titles} - {''}
+        if not keys:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            existing = self._films.get(tmdb_id)
+            if existing:
+                keys |= set(existing['titles'])
+            film = {'titles': sorted(keys), 'year': parse_year(year), 'original_language': original_language}
+            self._insert(tmdb_id, film)
+        self._store.set('title_index', str(tmdb_id), film, TITLE_INDEX_TTL_SECONDS)
+
+    def _year_matches(self, tmdb_id, year, strict):
+        film_year = self._films[tmdb_id]['year']
+        if year is None or film_year is None:
+            return not strict
+        return abs(film_year - year) <= 1
+
+    def lookup(self, title, year_hint=None):
+        """Film déjà résolu pour ce titre : (tmdb_id, original_language), ou None."""
+        key = self.title_key(title)
+        if not key:
             return None
-        # Nettoyer le titre (enlever les sous-titres)
-        clean_title = normalize_title(title)
-        
-        search_url = f"{TMDB_BASE_URL}/search/movie"
-        params = {
-            'api_key': TMDB_API_KEY,
-            'query': clean_title,
-            'language': 'fr-FR'
-        }
-        
-        response = SESSION.get(search_url, params=params, timeout=6, headers=SESSION_HEADERS)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get('results') and len(data['results']) > 0:
-            # Choisir le meilleur résultat (éviter les mauvais matchs)
-            candidates = data['results']
-            movie = pick_best_tmdb_match(candidates, clean_title, year_hint)
-            if not movie:
+        year = parse_year(year_hint)
+        with self._lock:
+            self._ensure_loaded()
+            exact = [tmdb_id for tmdb_id in self._by_title.get(key, ()) if self._year_matches(tmdb_id, year, strict=False)]
+            if len(exact) > 1:
+                # Titre partagé (remake...) : seule une année connue départage
+                exact = [tmdb_id for tmdb_id in exact if self._year_matches(tmdb_id, year, strict=True)]
+            if len(exact) == 1:
+                return exact[0], self._films[exact[0]]['original_language']
+            if exact or year is None:
                 return None
 
-            # Récupérer les détails complets du film
-            movie_id = movie['id']
-            details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-            details_params = {
-                'api_key': TMDB_API_KEY,
-                'language': 'fr-FR',
-                'append_to_response': 'credits,images',
-                'include_image_language': f"{movie.get('original_language')},en,fr,null"
-            }
-            
-            details_response = SESSION.get(details_url, params=details_params, timeout=6, headers=SESSION_HEADERS)
-            details_response.raise_for_status()
-            details = details_response.json()
-            
-            # Extraire les infos
-            runtime = details.get('runtime', 0) or 0
-            duration = f"{runtime // 60}h{runtime % 60:02d}" if runtime > 0 else "Durée inconnue"
-            
-            # Réalisateur
-            director = "Réalisateur inconnu"
-            if 'credits' in details and 'crew' in details['credits']:
-                for person in details['credits']['crew']:
-                    if person.get('job') == 'Director':
-                        director = person.get('name', 'Réalisateur inconnu')
-                        break
-            
-            # Acteurs principaux (top 3)
-            actors = []
-            if 'credits' in details and 'cast' in details['credits']:
-                actors = [actor['name'] for actor in details['credits']['cast'][:5]]
-            
-            # Affiche (langue originale prioritaire)
-            poster_path = pick_best_poster_path(details, movie)
-            poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else None
-            
-            # Genres (maximum 2)
-            genres = []
-            if 'genres' in details:
-                genres = [genre['name'] for genre in details['genres'][:2]]
+            # Variantes proches : candidats par trigrammes communs, année obligatoire
+            shared = Counter()
+            for gram in self.trigrams(key):
+                for tmdb_id in self._by_trigram.get(gram, ()):
+                    shared[tmdb_id] += 1
+            numbers = self.sequel_numbers(key)
+            best_id = None
+            best_score = 0.0
+            for tmdb_id, _ in shared.most_common(TITLE_INDEX_CANDIDATES):
+                if not self._year_matches(tmdb_id, year, strict=True):
+                    continue
+                for cand_key in self._films[tmdb_id]['titles']:
+                    # 'Saw III' n'est pas une variante de 'Saw II' : les numéros doivent coïncider
+                    if self.sequel_numbers(cand_key) != numbers:
+                        continue
+                    score = SequenceMatcher(None, key, cand_key).ratio()
+                    if score > best_score:
+                        best_score = score
+                        best_id = tmdb_id
+            if best_id is None or best_score < TITLE_INDEX_MIN_SCORE:
+                return None
+            return best_id, self._films[best_id]['original_language']
 
-            return {
-                'tmdb_id': movie_id,
-                'duration': duration,
-                'duration_minutes': runtime,
-                'director': director,
-                'actors': actors,
-                'poster_url': poster_url,
-                'letterboxd_url': f"https://letterboxd.com/tmdb/{movie_id}",
-                'release_date': details.get('release_date', ''),
-                'overview': details.get('overview', ''),
-                'vote_average': details.get('vote_average', 0),
-                'genres': genres
-            }
-        
+TITLE_INDEX = TitleIndex(PERSISTENT_CACHE)
+
+def tmdb_match_cache_key(title, year_hint=None):
+    return f"{normalize_key(title)}|{year_hint or ''}"
+
+def tmdb_movie_by_id(tmdb_id, original_language=None):
+    """Infos d'un film TMDB connu par son ID (cache persistant, sinon appel détails)."""
+    entry = PERSISTENT_CACHE.get('tmdb_movie', str(tmdb_id))
+    if entry is not None:
+        return entry[0]
+    movie = fetch_tmdb_details(tmdb_id, {'original_language': original_language})
+    PERSISTENT_CACHE.set('tmdb_movie', str(tmdb_id), movie, TMDB_MATCH_TTL_SECONDS)
+    return movie
+
+def link_allocine_tmdb(allocine_id, movie):
+    """Mémorise la correspondance ID film Allociné -> tmdb_id."""
+    if allocine_id and movie:
+        PERSISTENT_CACHE.set('allocine_tmdb', str(allocine_id), {
+            'tmdb_id': movie['tmdb_id'],
+            'original_language': movie.get('original_language'),
+        }, ALLOCINE_TMDB_TTL_SECONDS)
+
+def search_movie_tmdb(title, year_hint=None, allocine_id=None):
+    """Recherche un film sur TMDB et retourne ses infos (cache persistant)"""
+    if not TMDB_API_KEY:
+        logger.warning("TMDB_API_KEY manquante, enrichissement désactivé.")
         return None
-        
+
+    # Film Allociné déjà relié à TMDB : directement les détails, sans recherche par titre
+    if allocine_id:
+        crosswalk = PERSISTENT_CACHE.get('allocine_tmdb', str(allocine_id))
+        if crosswalk is not None:
+            try:
+                movie = tmdb_movie_by_id(crosswalk[0]['tmdb_id'], crosswalk[0].get('original_language'))
+            except Exception as e:
+                logger.error(f"Erreur TMDB pour '{title}' (tmdb_id {crosswalk[0]['tmdb_id']}): {e}")
+                TMDB_LOOKUPS.inc(source='crosswalk', result='error')
+                return None
+            TMDB_LOOKUPS.inc(source='crosswalk', result='match')
+            return movie
+
+    cache_key = tmdb_match_cache_key(title, year_hint)
+    entry = PERSISTENT_CACHE.get('tmdb_match', cache_key)
+    if entry is not None:
+        # Une erreur récente n'est pas retentée avant TMDB_ERROR_TTL_SECONDS
+        movie = entry[0].get('movie')
+        TMDB_LOOKUPS.inc(source='match_cache', result=entry[0].get('status'))
+        link_allocine_tmdb(allocine_id, movie)
+        return movie
+
+    source = 'search'
+    try:
+        indexed = TITLE_INDEX.lookup(title, year_hint)
+        if indexed:
+            source = 'title_index'
+            # Film déjà résolu (ou variante proche) : directement les détails, sans recherche
+            tmdb_id, original_language = indexed
+            movie = tmdb_movie_by_id(tmdb_id, original_language)
+        else:
+            movie = fetch_movie_tmdb(title, year_hint)
     except Exception as e:
         logger.error(f"Erreur TMDB pour '{title}': {e}")
+        PERSISTENT_CACHE.set('tmdb_match', cache_key, {'status': 'error'}, TMDB_ERROR_TTL_SECONDS)
+        TMDB_LOOKUPS.inc(source=source, result='error')
+        return None
+
+    TMDB_LOOKUPS.inc(source=source, result='match' if movie else 'no_match')
+    if movie:
+        PERSISTENT_CACHE.set('tmdb_match', cache_key, {'status': 'match', 'movie': movie}, TMDB_MATCH_TTL_SECONDS)
+        PERSISTENT_CACHE.set('tmdb_movie', str(movie['tmdb_id']), movie, TMDB_MATCH_TTL_SECONDS)
+        link_allocine_tmdb(allocine_id, movie)
+    else:
+        PERSISTENT_CACHE.set('tmdb_match', cache_key, {'status': 'no_match'}, TMDB_NO_MATCH_TTL_SECONDS)
+    return movie
+
+def fetch_movie_tmdb(title, year_hint=None):
+    """Interroge TMDB (recherche + détails) ; None si aucun match, exception si erreur."""
+    # Nettoyer le titre (enlever les sous-titres)
+    clean_title = normalize_title(title)
+
+    search_url = f"{TMDB_BASE_URL}/search/movie"
+    params = {
+        'api_key': TMDB_API_KEY,
+        'query': clean_title,
+        'language': 'fr-FR'
+    }
+
+    with timed('tmdb-search'):
+        response = http_get(search_url, params=params, timeout=6, cache_ttl=TMDB_SEARCH_HTTP_TTL_SECONDS)
+    response.raise_for_status()
+    data = response.json()
+
+    if not data.get('results'):
+        return None
+
+    # Choisir le meilleur résultat (éviter les mauvais matchs)
+    movie = pick_best_tmdb_match(data['results'], clean_title, year_hint)
+    if not movie:
         return None
 
+    details = fetch_tmdb_details(movie['id'], movie)
+    TITLE_INDEX.add(
+        movie['id'],
+        [clean_title, movie.get('title'), movie.get('original_title')],
+        year=movie.get('release_date'),
+        original_language=movie.get('original_language'),
+    )
+    return details
+
+def fetch_tmdb_details(movie_id, movie_candidate=None):
+    """Récupère les détails complets d'un film TMDB et extrait les infos utiles."""
+    original_language = (movie_candidate or {}).get('original_language')
+    details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
+    details_params = {
+        'api_key': TMDB_API_KEY,
+        'language': 'fr-FR',
+        'append_to_response': 'credits,images',
+        'include_image_language': f"{original_language},en,fr,null"
+    }
+
+    with timed('tmdb-details'):
+        details_response = http_get(details_url, params=details_params, timeout=6, cache_ttl=TMDB_DETAILS_HTTP_TTL_SECONDS)
+    details_response.raise_for_status()
+    details = details_response.json()
+
+    # Extraire les infos
+    runtime = details.get('runtime', 0) or 0
+    duration = f"{runtime // 60}h{runtime % 60:02d}" if runtime > 0 else "Durée inconnue"
+
+    # Réalisateur
+    director = "Réalisateur inconnu"
+    if 'credits' in details and 'crew' in details['credits']:
+        for person in details['credits']['crew']:
+            if person.get('job') == 'Director':
+                director = person.get('name', 'Réalisateur inconnu')
+                break
+
+    # Acteurs principaux (top 3)
+    actors = []
+    if 'credits' in details and 'cast' in details['credits']:
+        actors = [actor['name'] for actor in details['credits']['cast'][:5]]
+
+    # Affiche (langue originale prioritaire)
+    poster_path = pick_best_poster_path(details, movie_candidate)
+    poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else None
+
+    # Genres (maximum 2)
+    genres = []
+    if 'genres' in details:
+        genres = [genre['name'] for genre in details['genres'][:2]]
+
+    return {
+        'tmdb_id': movie_id,
+        'duration': duration,
+        'duration_minutes': runtime,
+        'director': director,
+        'actors': actors,
+        'poster_url': poster_url,
+        'letterboxd_url': f"https://letterboxd.com/tmdb/{movie_id}",
+        'release_date': details.get('release_date', ''),
+        'overview': details.get('overview', ''),
+        'vote_average': details.get('vote_average', 0),
+        'genres': genres,
+        'original_language': details.get('original_language')
+    }
+
+def fetch_allocine_showtimes_page(cinema_id, date_str, page):
+    url = f"{ALLOCINE_BASE_URL}/_/showtimes/theater-{cinema_id}/d-{date_str}/p-{page}"
+    with timed('allocine-json'):
+        response = http_get(url, timeout=10, cache_ttl=ALLOCINE_HTTP_TTL_SECONDS)
+    response.raise_for_status()
+    return response.text
+
+def content_fingerprint(source, bodies):
+    """Empreinte des corps bruts (str ou bytes) d'une source."""
+    digest = hashlib.sha1(source.encode('utf-8'))
+    for body in bodies:
+        digest.update(b'\0')
+        digest.update(body.encode('utf-8') if isinstance(body, str) else body)
+    return digest.hexdigest()
+
+def parse_with_fingerprint(source, bodies, parse):
+    """parse(bodies), ou les films déjà extraits de corps identiques (cache persistant)."""
+    fingerprint = content_fingerprint(source, bodies)
+    entry = PERSISTENT_CACHE.get('parsed_listing', fingerprint)
+    if entry is not None:
+        LISTING_REUSES.inc(stage='parse')
+        return entry[0]
+    movies = parse(bodies)
+    PERSISTENT_CACHE.set('parsed_listing', fingerprint, movies, PARSED_LISTING_TTL_SECONDS)
+    return movies
+
 def fetch_allocine_showtimes_json(cinema_id, date_str):
     """Récupère les horaires depuis l'endpoint JSON d'Allociné."""
     try:
-        page = 1
-        total_pages = 1
-        movies_map = {}
-        while page <= total_pages:
-            url = f"https://www.allocine.fr/_/showtimes/theater-{cinema_id}/d-{date_str}/p-{page}"
-            response = SESSION.get(url, headers=SESSION_HEADERS, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            pagination = data.get('pagination', {})
-            total_pages = int(pagination.get('totalPages', total_pages))
-
-            for element in data.get('results', []):
-                movie_data = element.get('movie', {}) or {}
-                title = movie_data.get('title', 'Titre inconnu')
-                production_year = movie_data.get('productionYear')
-                poster_url = extract_allocine_poster_from_movie_data(movie_data)
-                showtimes = []
-                for showtimes_key in element.get('showtimes', {}).keys():
-                    for showtime in element.get('showtimes', {}).get(showtimes_key, []):
-                        starts_at = showtime.get('startsAt')
-                        if starts_at:
-                            showtimes.append(starts_at)
-
-                if showtimes:
-                    entry = movies_map.setdefault(title, {'showtimes': set(), 'year_hint': None, 'poster_url': None})
-                    entry['showtimes'].update(showtimes)
-                    if entry['year_hint'] is None and production_year:
-                        entry['year_hint'] = production_year
-                    if entry['poster_url'] is None and poster_url:
-                        entry['poster_url'] = poster_url
-
-            page += 1
-
-        movies = []
-        for title, payload in movies_map.items():
-            starts_at_set = payload.get('showtimes', set())
-            start_times = []
-            for starts_at in starts_at_set:
-                try:
-                    start_dt = datetime.fromisoformat(starts_at)
-                    start_times.append(start_dt.strftime('%H:%M'))
-                except Exception:
-                    continue
+        # La première page donne le nombre total de pages ; les suivantes partent en parallèle
+        first_text = fetch_allocine_showtimes_page(cinema_id, date_str, 1)
+        texts = [first_text]
+        total_pages = int(json.loads(first_text).get('pagination', {}).get('totalPages', 1))
+        if total_pages > 1:
+            futures = [
+                submit_in_context(PAGE_EXECUTOR, fetch_allocine_showtimes_page, cinema_id, date_str, page)
+                for page in range(2, total_pages + 1)
+            ]
+            texts.extend(future.result() for future in futures)
+        return parse_with_fingerprint('json', texts, parse_allocine_showtimes_pages)
+    except Exception as e:
+        logger.warning(f"Endpoint JSON Allociné indisponible pour {cinema_id}: {e}")
+        return None
 
-            if start_times:
+def parse_allocine_showtimes_pages(texts):
+    """Films d'une réponse JSON Allociné (corps bruts de toutes les pages)."""
+    movies_map = {}
+    for text in texts:
+        data = json.loads(text)
+        for element in data.get('results', []):
+            movie_data = element.get('movie', {}) or {}
+            title = movie_data.get('title', 'Titre inconnu')
+            production_year = movie_data.get('productionYear')
+            allocine_id = movie_data.get('internalId') or movie_data.get('id')
+            poster_url = extract_allocine_poster_from_movie_data(movie_data)
+            showtimes = []
+            for showtimes_key in element.get('showtimes', {}).keys():
+                for showtime in element.get('showtimes', {}).get(showtimes_key, []):
+                    starts_at = showtime.get('startsAt')
+                    if starts_at:
+                        showtimes.append(starts_at)
+
+            if showtimes:
+                entry = movies_map.setdefault(title, {'showtimes': set(), 'year_hint': None, 'poster_url': None, 'allocine_id': None})
+                entry['showtimes'].update(showtimes)
+                if entry['allocine_id'] is None and allocine_id:
+                    entry['allocine_id'] = allocine_id
+                if entry['year_hint'] is None and production_year:
+                    entry['year_hint'] = production_year
+                if entry['poster_url'] is None and poster_url:
+                    entry['poster_url'] = poster_url
+
+    movies = []
+    for title, payload in movies_map.items():
+        starts_at_set = payload.get('showtimes', set())
+        start_times = []
+        for starts_at in starts_at_set:
+            try:
+                start_dt = datetime.fromisoformat(starts_at)
+                start_times.append(start_dt.strftime('%H:%M'))
+            except Exception:
+                continue
+
+        if start_times:
+            movies.append({
+                'title': title,
+                'start_times': sorted(set(start_times)),
+                'year_hint': payload.get('year_hint'),
+                'poster_url': payload.get('poster_url'),
+                'allocine_id': payload.get('allocine_id')
+            })
+
+    return movies
+
+def parse_time_matches(matches):
+    starts = []
+    for match in matches:
+        hour = int(match.group(1))
+        minute = int(match.group(2))
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            starts.append(f"{hour:02d}:{minute:02d}")
+    return starts
+
+def parse_allocine_showtimes_html(content, parser=None):
+    """Extrait les films et horaires des cartes film d'une page salle Allociné."""
+    # Seules les cartes film sont construites en arbre, le reste de la page est ignoré
+    soup = BeautifulSoup(content, parser or HTML_PARSER, parse_only=MOVIE_CARD_STRAINER)
+
+    movies = []
+    for movie_div in soup.select('div.movie-card-theater'):
+        try:
+            # Titre (et ID film Allociné depuis le lien fichefilm_gen_cfilm=...)
+            title = "Titre inconnu"
+            allocine_id = None
+            title_link = movie_div.select_one('h2.meta-title a, a.meta-title-link')
+            if title_link:
+                title = title_link.get_text(strip=True)
+                film_id_match = ALLOCINE_FILM_ID_PATTERN.search(title_link.get('href') or '')
+                if film_id_match:
+                    allocine_id = int(film_id_match.group(1))
+
+            # Horaires
+            span_matches = [
+                ALLOCINE_TIME_PATTERN.search(span.get_text(strip=True))
+                for span in movie_div.select('.showtimes-hour-item-value')
+            ]
+            starts = parse_time_matches(match for match in span_matches if match)
+            if not starts:
+                # Fallback: extraire les horaires du texte complet
+                starts = parse_time_matches(ALLOCINE_TIME_PATTERN.finditer(movie_div.get_text()))
+
+            # Dédupliquer
+            unique_starts = sorted(set(starts))
+
+            if unique_starts:
+                poster_url = None
+                poster_img = movie_div.select_one('img.thumbnail-img, img.thumbnail, .thumbnail img, img[data-src], img[src]')
+                if poster_img:
+                    poster_url = normalize_image_url(
+                        poster_img.get('data-src') or poster_img.get('src')
+                    )
                 movies.append({
                     'title': title,
-                    'start_times': sorted(set(start_times)),
-                    'year_hint': payload.get('year_hint'),
-                    'poster_url': payload.get('poster_url')
+                    'showtimes': [{'start': start} for start in unique_starts],
+                    'poster_url': poster_url,
+                    'allocine_id': allocine_id
                 })
 
-        return movies
-    except Exception as e:
-        logger.warning(f"Endpoint JSON Allociné indisponible pour {cinema_id}: {e}")
-        return None
+        except Exception as e:
+            logger.error(f"Erreur parsing film: {e}")
+            continue
+
+    return movies
 
 def fetch_allocine_showtimes_html(cinema_id):
-    """Scrape les horaires depuis l'HTML Allociné (fallback)."""
+    """Scrape les horaires depuis l'HTML Allociné (fallback) ; None si la page est indisponible."""
     try:
-        url = f"https://www.allocine.fr/seance/salle_gen_csalle={cinema_id}.html"
-        
-        response = SESSION.get(url, headers=SESSION_HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        movies = []
-        movie_divs = soup.select('div.movie-card-theater')
-        
-        for movie_div in movie_divs:
-            try:
-                # Titre
-                title = "Titre inconnu"
-                title_link = movie_div.select_one('h2.meta-title a, a.meta-title-link')
-                if title_link:
-                    title = title_link.get_text(strip=True)
-                
-                # Horaires
-                showtimes = []
-                time_spans = movie_div.select('.showtimes-hour-item-value')
-                time_pattern = re.compile(r'\b(\d{1,2})[:h](\d{2})\b')
-
-                for span in time_spans:
-                    text = span.get_text(strip=True)
-                    match = time_pattern.search(text)
-                    if match:
-                        hour = int(match.group(1))
-                        minute = int(match.group(2))
-                        if 0 <= hour <= 23 and 0 <= minute <= 59:
-                            showtimes.append({'start': f"{hour:02d}:{minute:02d}"})
-                
-                if not showtimes:
-                    # Fallback: extraire les horaires du texte complet
-                    for match in time_pattern.finditer(movie_div.get_text()):
-                        hour = int(match.group(1))
-                        minute = int(match.group(2))
-                        if 0 <= hour <= 23 and 0 <= minute <= 59:
-                            showtimes.append({'start': f"{hour:02d}:{minute:02d}"})
-                
-                # Dédupliquer
-                seen = set()
-                unique_showtimes = []
-                for st in showtimes:
-                    key = st['start']
-                    if key not in seen:
-                        seen.add(key)
-                        unique_showtimes.append(st)
-                
-                if unique_showtimes:
-                    poster_url = None
-                    poster_img = movie_div.select_one('img.thumbnail-img, img.thumbnail, .thumbnail img, img[data-src], img[src]')
-                    if poster_img:
-                        poster_url = normalize_image_url(
-                            poster_img.get('data-src') or poster_img.get('src')
-                        )
-                    movies.append({
-                        'title': title,
-                        'showtimes': sorted(unique_showtimes, key=lambda x: x['start']),
-                        'poster_url': poster_url
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Erreur parsing film: {e}")
-                continue
-        
-        return movies
-        
+        url = f"{ALLOCINE_BASE_URL}/seance/salle_gen_csalle={cinema_id}.html"
+
+        with timed('allocine-html'):
+            response = http_get(url, timeout=10, cache_ttl=ALLOCINE_HTTP_TTL_SECONDS)
+            response.raise_for_status()
+            return parse_with_fingerprint(
+                'html', [response.content], lambda bodies: parse_allocine_showtimes_html(bodies[0])
+            )
+
     except Exception as e:
         logger.error(f"Erreur scraping {cinema_id}: {e}")
-        return []
+        return None
 
-def scrape_allocine_showtimes(cinema_id, date_str):
-    """Récupère les horaires depuis Allociné et enrichit avec TMDB"""
-    movies = fetch_allocine_showtimes_json(cinema_id, date_str)
-    # Fallback HTML si l'endpoint JSON est indisponible ou vide pour la date du jour
-    if movies is None or (len(movies) == 0 and date_str == datetime.now().strftime('%Y-%m-%d')):
+def fetch_from_source(source, cinema_id, date_str):
+    """Films bruts d'une source Allociné ('json' ou 'html'), en notant pour la date du jour si elle a donné des films."""
+    if source == 'json':
+        movies = fetch_allocine_showtimes_json(cinema_id, date_str)
+    else:
         movies = fetch_allocine_showtimes_html(cinema_id)
+    # Seuls les essais du jour comptent : les autres dates n'existent qu'en JSON, souvent vides
+    # (séances pas encore publiées), et rebasculeraient sans cesse un cinéma vers la route json
+    if date_str == datetime.now().strftime('%Y-%m-%d'):
+        source_health_for(cinema_id).record(source, bool(movies))
+    return movies
+
+def race_allocine_sources(cinema_id, date_str):
+    """Interroge JSON et HTML en parallèle ; la première source avec des films l'emporte."""
+    future_map = {
+        submit_in_context(SOURCE_EXECUTOR, fetch_from_source, source, cinema_id, date_str): source
+        for source in ALLOCINE_SOURCES
+    }
+    results = {}
+    for future in as_completed(future_map):
+        movies = future.result()
+        if movies:
+            return movies
+        results[future_map[future]] = movies
+    return results['html'] if results['html'] is not None else results['json']
+
+def fetch_allocine_movies(cinema_id, date_str):
+    """Films bruts par la source qui marche pour ce cinéma ; None si aucune ne répond.
+
+    Hors date du jour, seul le JSON a les horaires. Pour aujourd'hui, la source qui a donné
+    des films au dernier essai est interrogée directement (l'autre en secours) ; si on ne sait
+    pas encore, les deux partent en course.
+    """
+    if date_str != datetime.now().strftime('%Y-%m-%d'):
+        return fetch_from_source('json', cinema_id, date_str)
 
-    enriched_movies = []
+    route = source_health_for(cinema_id).route()
+    ALLOCINE_ROUTES.inc(cinema=cinema_id, route=route)
+    if route == 'race':
+        return race_allocine_sources(cinema_id, date_str)
+
+    movies = fetch_from_source(route, cinema_id, date_str)
+    if not movies:
+        fallback = 'html' if route == 'json' else 'json'
+        fallback_movies = fetch_from_source(fallback, cinema_id, date_str)
+        ALLOCINE_FALLBACKS.inc(cinema=cinema_id, source=fallback, result='error' if fallback_movies is None else 'ok')
+        if fallback_movies is not None:
+            movies = fallback_movies
+    return movies
+
+def fetch_allocine_listing(cinema_id, date_str):
+    """Horaires bruts d'un cinéma (JSON ou page HTML), sans TMDB ; None si aucune source ne répond."""
+    start = time.perf_counter()
+    movies = fetch_allocine_movies(cinema_id, date_str)
+    CINEMA_SCRAPE_LATENCY.observe(time.perf_counter() - start, cinema=cinema_id)
+    if movies is None:
+        CINEMA_SCRAPE_FAILURES.inc(cinema=cinema_id)
+        return None
+
+    listing = []
     for movie in movies:
-        title = movie.get('title', 'Titre inconnu')
-        year_hint = movie.get('year_hint')
-        allocine_poster_url = movie.get('poster_url')
-        showtimes = movie.get('showtimes')
-        if not showtimes:
+        start_times = [showtime['start'] for showtime in movie.get('showtimes') or []]
+        if not start_times:
             start_times = movie.get('start_times', [])
-            showtimes = [{'start': st} for st in start_times]
 
-        if not showtimes:
-            continue
+        if start_times:
+            listing.append({
+                'title': movie.get('title', 'Titre inconnu'),
+                'year_hint': movie.get('year_hint'),
+                'poster_url': movie.get('poster_url'),
+                'allocine_id': movie.get('allocine_id'),
+                'start_times': sorted(start_times),
+            })
+    return listing
 
-        tmdb_data = search_movie_tmdb(title, year_hint)
-        duration_minutes = 120
-        if tmdb_data and tmdb_data.get('duration_minutes'):
-            duration_minutes = tmdb_data['duration_minutes']
+def fetch_cinema_listing(cinema_id, date_str):
+    """fetch_allocine_listing avec un seul scrape en vol par (cinéma, date)."""
+    token = TIMING_CINEMA.set(cinema_id)
+    try:
+        with timed('scrape'):
+            return SCRAPE_FLIGHT.do((cinema_id, date_str), fetch_allocine_listing, cinema_id, date_str)
+    finally:
+        TIMING_CINEMA.reset(token)
 
-        for showtime in showtimes:
-            start_dt = datetime.strptime(showtime['start'], '%H:%M')
-            end_dt = start_dt + timedelta(minutes=duration_minutes)
-            showtime['end'] = end_dt.strftime('%H:%M')
+def enrichment_key(movie):
+    """Clé de dédoublonnage d'un film : ID Allociné si connu, sinon (titre normalisé, année)."""
+    if movie.get('allocine_id'):
+        return f"allocine:{movie['allocine_id']}"
+    return tmdb_match_cache_key(movie['title'], movie['year_hint'])
 
-        if tmdb_data:
-            enriched_movies.append({
-                'title': title,
-                'director': tmdb_data['director'],
-                'duration': tmdb_data['duration'],
-                'showtimes': sorted(showtimes, key=lambda x: x['start']),
-                'actors': tmdb_data['actors'],
-                'poster_url': allocine_poster_url or tmdb_data['poster_url'],
-                'letterboxd_url': tmdb_data.get('letterboxd_url'),
-                'release_date': tmdb_data['release_date'],
-                'overview': tmdb_data['overview'],
-                'vote_average': tmdb_data['vote_average'],
-                'genres': tmdb_data['genres']
-            })
-        else:
-            enriched_movies.append({
-                'title': title,
+def lookup_tmdb(movie):
+    """search_movie_tmdb avec une seule recherche en vol par film."""
+    return TMDB_FLIGHT.do(
+        enrichment_key(movie), search_movie_tmdb,
+        movie['title'], movie['year_hint'], movie.get('allocine_id'),
+    )
+
+def enrich_listings(listings, known=()):
+    """Recherche TMDB une seule fois par film sur l'ensemble des listes (hors clés de known)."""
+    unique_movies = {}
+    for listing in listings:
+        for movie in listing:
+            key = enrichment_key(movie)
+            if key not in known:
+                unique_movies.setdefault(key, movie)
+
+    # Enrichissement TMDB en parallèle (pool borné partagé entre cinémas)
+    futures = {
+        key: submit_in_context(ENRICH_EXECUTOR, lookup_tmdb, movie)
+        for key, movie in unique_movies.items()
+    }
+    tmdb_by_key = {}
+    with timed('enrich'):
+        for key, future in futures.items():
+            try:
+                tmdb_by_key[key] = future.result()
+            except Exception as exc:
+                logger.error(f"Erreur enrichissement TMDB pour '{unique_movies[key]['title']}': {exc}")
+                tmdb_by_key[key] = None
+    return tmdb_by_key
+
+# Heure 'HH:MM' de chaque minute de la journée (chaînes partagées par toutes les séances)
+MINUTE_LABELS = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60))
+DEFAULT_DURATION_MINUTES = 120
+
+def parse_minutes(value):
+    """'HH:MM' -> minutes depuis minuit."""
+    hours, _, minutes = value.partition(':')
+    return int(hours) * 60 + int(minutes)
+
+def intern_text(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class FilmInfo:
+    """Infos TMDB d'un film, une seule instance partagée par toutes ses séances (cinémas et dates)."""
+
+    __slots__ = (
+        'tmdb_id', 'director', 'duration', 'duration_minutes', 'actors', 'poster_url',
+        'letterboxd_url', 'release_date', 'overview', 'vote_average', 'genres', '__weakref__',
+    )
+    fields = __slots__[:-1]
+
+    def __init__(self, tmdb_data):
+        for field in self.fields:
+            value = tmdb_data.get(field)
+            if field in ('actors', 'genres'):
+                value = tuple(intern_text(item) for item in value or ())
+            setattr(self, field, intern_text(value))
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    def to_dict(self):
+        return {field: list(value) if isinstance(value, tuple) else value
+                for field, value in zip(self.fields, self.values())}
+
+# tmdb_id -> FilmInfo encore référencée par une entrée du cache
+FILM_INFOS = weakref.WeakValueDictionary()
+_FILM_INFOS_LOCK = threading.Lock()
+
+def film_info_for(tmdb_data):
+    """FilmInfo partagée pour ces infos TMDB (nouvelle instance si elles ont changé)."""
+    if not tmdb_data:
+        return None
+    candidate = FilmInfo(tmdb_data)
+    with _FILM_INFOS_LOCK:
+        existing = FILM_INFOS.get(candidate.tmdb_id)
+        if existing is not None and existing.values() == candidate.values():
+            return existing
+        FILM_INFOS[candidate.tmdb_id] = candidate
+    return candidate
+
+class MovieShowtimes:
+    """Séances d'un film dans un cinéma pour une date ; débuts en minutes depuis minuit.
+
+    Les dicts de l'API ne sont construits qu'à la sérialisation (to_dict).
+    """
+
+    __slots__ = ('title', 'poster_url', 'film', 'starts')
+
+    def __init__(self, title, poster_url, film, starts):
+        self.title = sys.intern(title)
+        self.poster_url = intern_text(poster_url)
+        self.film = film
+        self.starts = array('H', starts)
+
+    @property
+    def duration_minutes(self):
+        if self.film is not None and self.film.duration_minutes:
+            return self.film.duration_minutes
+        return DEFAULT_DURATION_MINUTES
+
+    def showtimes(self):
+        duration = self.duration_minutes
+        return [
+            {'start': MINUTE_LABELS[start], 'end': MINUTE_LABELS[(start + duration) % len(MINUTE_LABELS)]}
+            for start in self.starts
+        ]
+
+    def to_dict(self):
+        film = self.film
+        if film is None:
+            return {
+                'title': self.title,
                 'director': 'Réalisateur inconnu',
                 'duration': '2h00',
-                'showtimes': sorted(showtimes, key=lambda x: x['start']),
+                'showtimes': self.showtimes(),
                 'actors': [],
-                'poster_url': allocine_poster_url,
+                'poster_url': self.poster_url,
                 'letterboxd_url': None,
                 'release_date': '',
                 'overview': '',
                 'vote_average': 0,
-                'genres': []
-            })
+                'genres': [],
+                'tmdb_id': None
+            }
+        return {
+            'title': self.title,
+            'director': film.director,
+            'duration': film.duration,
+            'showtimes': self.showtimes(),
+            'actors': list(film.actors),
+            'poster_url': self.poster_url or film.poster_url,
+            'letterboxd_url': film.letterboxd_url,
+            'release_date': film.release_date,
+            'overview': film.overview,
+            'vote_average': film.vote_average,
+            'genres': list(film.genres),
+            'tmdb_id': film.tmdb_id
+        }
+
+def movies_as_dicts(movies):
+    return [movie.to_dict() for movie in movies]
+
+def pack_movies(movies):
+    """Forme JSON compacte d'une liste de MovieShowtimes (infos TMDB une fois par film)."""
+    films = {}
+    records = []
+    for movie in movies:
+        tmdb_id = movie.film.tmdb_id if movie.film is not None else None
+        if tmdb_id is not None and tmdb_id not in films:
+            films[tmdb_id] = movie.film.to_dict()
+        records.append([movie.title, movie.poster_url, tmdb_id, movie.starts.tolist()])
+    return {'films': list(films.values()), 'records': records}
 
-    return enriched_movies
+def unpack_movies(data):
+    """Inverse de pack_movies ; None pour une entrée d'un ancien format."""
+    if 'records' not in data:
+        return None
+    films = {film['tmdb_id']: film_info_for(film) for film in data['films']}
+    return [
+        MovieShowtimes(title, poster_url, films.get(tmdb_id), starts)
+        for title, poster_url, tmdb_id, starts in data['records']
+    ]
+
+def build_enriched_movies(listing, tmdb_by_key):
+    """Assemble les séances d'un cinéma (MovieShowtimes) avec leurs infos TMDB."""
+    return [
+        MovieShowtimes(
+            movie['title'],
+            movie['poster_url'],
+            film_info_for(tmdb_by_key.get(enrichment_key(movie))),
+            [parse_minutes(start) for start in movie['start_times']],
+        )
+        for movie in listing
+    ]
 
 @app.route('/')
 def home():
@@ -515,7 +2072,10 @@ def home():
         'message': 'API Séance(s) - Horaires de cinéma à Paris',
         'endpoints': {
             '/cinemas': 'Liste des cinémas',
-            '/showtimes?date=YYYY-MM-DD': 'Horaires (scraping Allociné + TMDB)',
+            '/showtimes?date=YYYY-MM-DD&cinemas=nom1,nom2&format=normalized': 'Horaires (scraping Allociné + TMDB)',
+            '/showtimes/range?from=YYYY-MM-DD&to=YYYY-MM-DD': 'Horaires de plusieurs dates',
+            '/showtimes/stream?date=YYYY-MM-DD': 'Horaires en flux SSE, cinéma par cinéma',
+            '/metrics': 'Métriques Prometheus (caches, appels amont, scrapes)',
             '/test-cinema/<cinema_name>': 'Tester un seul cinéma'
         }
     })
@@ -526,55 +2086,587 @@ def get_cinemas():
         'cinemas': list(CINEMA_IDS.keys())
     })
 
+def parse_date_param(value):
+    """Date YYYY-MM-DD (aujourd'hui par défaut) ; ValueError si le format est invalide."""
+    if value:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    return datetime.now().strftime('%Y-%m-%d')
+
+def parse_cinemas_param(value):
+    """Sélection ?cinemas=nom1,nom2 (noms ou IDs Allociné) -> ({nom: id}, inconnus)."""
+    if not value:
+        return dict(CINEMA_IDS), []
+    names_by_id = {cinema_id: name for name, cinema_id in CINEMA_IDS.items()}
+    selected = {}
+    unknown = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item in CINEMA_IDS:
+            selected[item] = CINEMA_IDS[item]
+        elif item in names_by_id:
+            selected[names_by_id[item]] = item
+        else:
+            unknown.append(item)
+    return selected, unknown
+
+def listing_fingerprint(listing):
+    """Empreinte d'une liste Allociné brute : même empreinte, mêmes films enrichis."""
+    return hashlib.sha1(json.dumps(listing, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def store_cinema_showtimes(pair, listing, tmdb_by_key, fingerprint=None):
+    """Met à jour l'entrée de cache d'un (cinema_id, date) à partir de sa liste brute."""
+    if listing is None:
+        # Aucune source n'a répondu : l'entrée précédente est prolongée (avec son âge) jusqu'au
+        # prochain essai, et les workers qui attendaient ce scrape la prennent comme résultat
+        cached = SHOWTIMES_CACHE.get(pair)
+        if cached:
+            SHOWTIMES_CACHE.touch(pair, SHOWTIMES_ERROR_TTL_SECONDS, keep_stored_at=True)
+            return cached[2]
+        SHOWTIMES_CACHE.put(pair, [], SHOWTIMES_ERROR_TTL_SECONDS)
+        return []
+    movies = build_enriched_movies(listing, tmdb_by_key)
+    SHOWTIMES_CACHE.put(pair, movies, SHOWTIMES_TTL_SECONDS, fingerprint)
+    return movies
+
+def scrape_lease_name(pair):
+    return f"scrape:{pair[0]}|{pair[1]}"
+
+def claim_scrapes(pairs, results):
+    """Prend le bail de scrape de chaque (cinema_id, date) ; retourne (à scraper, tenus ailleurs).
+
+    Une paire rafraîchie entre-temps par un autre worker est lue dans le cache partagé
+    et rangée directement dans results.
+    """
+    owner = str(os.getpid())
+    owned = []
+    others = []
+    for pair in pairs:
+        if not PERSISTENT_CACHE.try_lease(scrape_lease_name(pair), owner, SCRAPE_LEASE_SECONDS):
+            others.append(pair)
+            continue
+        cached = SHOWTIMES_CACHE.get(pair)
+        if cached and time.time() < cached[1]:
+            PERSISTENT_CACHE.release_lease(scrape_lease_name(pair), owner)
+            results[pair] = cached[2]
+        else:
+            owned.append(pair)
+    return owned, others
+
+def reuse_unchanged_listing(pair, listing):
+    """(empreinte, films) : films de l'entrée prolongés tels quels si la liste n'a pas changé, sinon None."""
+    if not listing:
+        return None, None
+    fingerprint = listing_fingerprint(listing)
+    movies = SHOWTIMES_CACHE.reusable(pair, fingerprint)
+    if movies is not None:
+        SHOWTIMES_CACHE.touch(pair, SHOWTIMES_TTL_SECONDS)
+        LISTING_REUSES.inc(stage='enrich')
+    return fingerprint, movies
+
+def scrape_and_store(pairs):
+    """Scrape des (cinema_id, date) et met à jour leurs entrées de cache.
+
+    Phase 1 : listes Allociné brutes de tous les cinémas, en parallèle.
+    Phase 2 : enrichissement TMDB de chaque (titre, année) unique, redistribué ensuite.
+    Un cinéma dont la liste n'a pas changé garde ses films enrichis, sans passer par TMDB.
+    """
+    listings = {}
+    if len(pairs) == 1:
+        # Un seul cinéma : dans le thread appelant (utilisable depuis SCRAPE_EXECUTOR)
+        future_map = {}
+        try:
+            listings[pairs[0]] = fetch_cinema_listing(*pairs[0])
+        except Exception as exc:
+            logger.error(f"Erreur scraping {pairs[0][0]} {pairs[0][1]}: {exc}")
+            listings[pairs[0]] = None
+    else:
+        future_map = {
+            submit_in_context(SCRAPE_EXECUTOR, fetch_cinema_listing, cinema_id, date_str): (cinema_id, date_str)
+            for cinema_id, date_str in pairs
+        }
+    for future in as_completed(future_map):
+        pair = future_map[future]
+        try:
+            listings[pair] = future.result()
+        except Exception as exc:
+            logger.error(f"Erreur scraping {pair[0]} {pair[1]}: {exc}")
+            listings[pair] = None
+
+    fingerprints = {}
+    results = {}
+    for pair, listing in listings.items():
+        fingerprints[pair], movies = reuse_unchanged_listing(pair, listing)
+        if movies is not None:
+            results[pair] = movies
+
+    tmdb_by_key = enrich_listings([
+        listing for pair, listing in listings.items() if listing and pair not in results
+    ])
+
+    for pair, listing in listings.items():
+        if pair not in results:
+            results[pair] = store_cinema_showtimes(pair, listing, tmdb_by_key, fingerprints.get(pair))
+    return results
+
+def scrape_leased(pairs):
+    """scrape_and_store des paires dont on détient le bail, libéré ensuite."""
+    try:
+        return scrape_and_store(pairs)
+    finally:
+        owner = str(os.getpid())
+        for pair in pairs:
+            PERSISTENT_CACHE.release_lease(scrape_lease_name(pair), owner)
+
+def poll_scrapes(pairs, since, results):
+    """Un passage d'attente des paires scrapées ailleurs ; retourne (baux repris, encore attendues).
+
+    Les entrées écrites (ou prolongées après un scrape en échec) depuis since sont rangées dans
+    results. Le bail n'est retenté (écriture SQLite) que s'il a été libéré sans nouvelle entrée
+    ou a expiré.
+    """
+    owned = []
+    waiting = []
+    for pair in pairs:
+        cached = SHOWTIMES_CACHE.get(pair)
+        if cached and (cached[0] >= since or time.time() < cached[1]):
+            results[pair] = cached[2]
+        elif PERSISTENT_CACHE.lease_expires_at(scrape_lease_name(pair)) is not None:
+            waiting.append(pair)
+        else:
+            claimed, others = claim_scrapes([pair], results)
+            owned.extend(claimed)
+            waiting.extend(others)
+    return owned, waiting
+
+def wait_for_scrapes(pairs, since):
+    """Attend les entrées scrapées par les détenteurs des baux (ou reprend un bail abandonné).
+
+    Bloque le thread appelant : jamais depuis SCRAPE_EXECUTOR, dont les threads font
+    avancer les scrapes attendus.
+    """
+    results = {}
+    pending = list(pairs)
+    delay = SCRAPE_LEASE_POLL_SECONDS
+    while pending:
+        time.sleep(delay)
+        delay = min(delay * 2, SCRAPE_LEASE_POLL_MAX_SECONDS)
+        owned, pending = poll_scrapes(pending, since, results)
+        if owned:
+            results.update(scrape_leased(owned))
+    return results
+
+def refresh_cinemas(pairs, wait_for_others=True):
+    """Scrape des (cinema_id, date) et met à jour leurs entrées de cache partagées.
+
+    Un bail par paire dans le cache persistant garantit un seul scrape à la fois sur tous
+    les workers : les paires scrapées ailleurs sont attendues, ou laissées à l'autre worker
+    si wait_for_others est faux (rafraîchissements en arrière-plan).
+    """
+    since = time.time()
+    results = {}
+    owned, others = claim_scrapes(pairs, results)
+    if owned:
+        results.update(scrape_leased(owned))
+    if others and wait_for_others:
+        results.update(wait_for_scrapes(others, since))
+    return results
+
+def refresh_cinema(cinema_id, date_str):
+    """Scrape un cinéma pour une date et met à jour son entrée de cache.
+
+    Peut attendre un bail tenu ailleurs (voir wait_for_scrapes) : à appeler hors de SCRAPE_EXECUTOR.
+    """
+    pair = (cinema_id, date_str)
+    return refresh_cinemas([pair])[pair]
+
+def iter_refreshed_cinemas(pairs):
+    """Rafraîchit des (cinema_id, date) et renvoie chaque (paire, films) dès qu'il est prêt.
+
+    Variante de refresh_cinemas pour le flux SSE. Les baux sont pris dans le thread appelant
+    et seules les listes Allociné des paires dont on détient le bail partent dans SCRAPE_EXECUTOR.
+    Chaque liste reçue est enrichie ici, sans rechercher à nouveau les films déjà vus dans le
+    flux ; les paires tenues ailleurs sont attendues entre deux listes.
+    """
+    since = time.time()
+    results = {}
+    owned, others = claim_scrapes(pairs, results)
+    yield from results.items()
+
+    owner = str(os.getpid())
+    tmdb_by_key = {}
+    future_map = {}
+    delay = SCRAPE_LEASE_POLL_SECONDS
+    next_poll = time.monotonic() + delay
+    try:
+        while owned or others or future_map:
+            for pair in owned:
+                future_map[submit_in_context(SCRAPE_EXECUTOR, fetch_cinema_listing, *pair)] = pair
+            owned = []
+            timeout = max(0.0, next_poll - time.monotonic()) if others else None
+            done, _ = wait(future_map, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                pair = future_map.pop(future)
+                try:
+                    try:
+                        listing = future.result()
+                    except Exception as exc:
+                        logger.error(f"Erreur scraping {pair[0]} {pair[1]}: {exc}")
+                        listing = None
+                    fingerprint, movies = reuse_unchanged_listing(pair, listing)
+                    if movies is None:
+                        if listing:
+                            tmdb_by_key.update(enrich_listings([listing], known=tmdb_by_key))
+                        movies = store_cinema_showtimes(pair, listing, tmdb_by_key, fingerprint)
+                finally:
+                    PERSISTENT_CACHE.release_lease(scrape_lease_name(pair), owner)
+                yield pair, movies
+            if others and time.monotonic() >= next_poll:
+                results = {}
+                owned, others = poll_scrapes(others, since, results)
+                yield from results.items()
+                delay = min(delay * 2, SCRAPE_LEASE_POLL_MAX_SECONDS)
+                next_poll = time.monotonic() + delay
+    finally:
+        # Flux interrompu (client parti) : les baux des listes encore en vol sont rendus
+        for pair in future_map.values():
+            PERSISTENT_CACHE.release_lease(scrape_lease_name(pair), owner)
+
+def schedule_refresh(pairs):
+    """Rafraîchit en arrière-plan les (cinema_id, date) qui ne sont pas déjà en attente."""
+    with _REFRESHING_LOCK:
+        pending = [pair for pair in pairs if pair not in _REFRESHING]
+        _REFRESHING.update(pending)
+    if not pending:
+        return False
+
+    def run():
+        try:
+            refresh_cinemas(pending, wait_for_others=False)
+        except Exception as exc:
+            logger.error(f"Erreur rafraîchissement {pending}: {exc}")
+        finally:
+            with _REFRESHING_LOCK:
+                _REFRESHING.difference_update(pending)
+
+    REFRESH_EXECUTOR.submit(run)
+    return True
+
+def collect_showtimes_range(cinemas, dates, stale_ages=None):
+    """Assemble les horaires des cinémas demandés ({nom: id}) pour plusieurs dates depuis le cache.
+
+    Les entrées périmées sont servies telles quelles et rafraîchies en arrière-plan (leur âge
+    en secondes est noté dans stale_ages[date][cinéma]) ; seules les entrées absentes sont
+    scrapées, toutes dates confondues en un seul lot (l'enrichissement TMDB est donc partagé
+    entre les jours).
+    """
+    showtimes_by_date = {date_str: {} for date_str in dates}
+    missing = []
+    stale = []
+    now = time.time()
+    for date_str in dates:
+        for cinema_name, cinema_id in cinemas.items():
+            cached = SHOWTIMES_CACHE.get((cinema_id, date_str))
+            if cached and now - cached[0] < SHOWTIMES_STALE_MAX_SECONDS:
+                showtimes_by_date[date_str][cinema_name] = cached[2]
+                if now >= cached[1]:
+                    stale.append((cinema_id, date_str))
+                    SHOWTIMES_CACHE_LOOKUPS.inc(result='stale')
+                    if stale_ages is not None:
+                        stale_ages.setdefault(date_str, {})[cinema_name] = round(now - cached[0])
+                else:
+                    SHOWTIMES_CACHE_LOOKUPS.inc(result='hit')
+            else:
+                missing.append((cinema_name, cinema_id, date_str))
+                SHOWTIMES_CACHE_LOOKUPS.inc(result='miss')
+
+    if stale:
+        schedule_refresh(stale)
+
+    if missing:
+        results = refresh_cinemas([(cinema_id, date_str) for _, cinema_id, date_str in missing])
+        for cinema_name, cinema_id, date_str in missing:
+            showtimes_by_date[date_str][cinema_name] = results[(cinema_id, date_str)]
+
+    return showtimes_by_date
+
+def collect_showtimes(cinemas, date_str, stale_ages=None):
+    """Assemble les horaires des cinémas demandés ({nom: id}) pour une date (âges périmés : {cinéma: s})."""
+    ages_by_date = {}
+    showtimes = collect_showtimes_range(cinemas, [date_str], ages_by_date)[date_str]
+    if stale_ages is not None:
+        stale_ages.update(ages_by_date.get(date_str, {}))
+    return showtimes
+
+def prewarm_dates():
+    """Dates maintenues au chaud : aujourd'hui et les 6 jours suivants."""
+    today = datetime.now()
+    return [(today + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(PREWARM_DAYS)]
+
+def evict_past_showtimes():
+    """Supprime du cache les dates passées."""
+    today_str = datetime.now().strftime('%Y-%m-%d')
+    for key in list(SHOWTIMES_CACHE.keys()):
+        if key[1] < today_str and SHOWTIMES_CACHE.pop(key, None) is not None:
+            SHOWTIMES_CACHE_EVICTIONS.inc()
+
+def prewarm_showtimes():
+    """Rafraîchit les entrées qui expireront avant le prochain passage."""
+    global _LAST_CACHE_PURGE
+    evict_past_showtimes()
+    if time.time() - _LAST_CACHE_PURGE >= CACHE_PURGE_INTERVAL_SECONDS:
+        _LAST_CACHE_PURGE = time.time()
+        PERSISTENT_CACHE.purge_expired(grace=CACHE_PURGE_GRACE_SECONDS)
+    refresh_before = time.time() + PREWARM_INTERVAL_SECONDS
+    for date_str in prewarm_dates():
+        due = []
+        for cinema_id in CINEMA_IDS.values():
+            cached = SHOWTIMES_CACHE.get((cinema_id, date_str))
+            if not cached or cached[1] <= refresh_before:
+                due.append((cinema_id, date_str))
+        if due:
+            schedule_refresh(due)
+
+def prewarm_loop():
+    while True:
+        try:
+            prewarm_showtimes()
+        except Exception as exc:
+            logger.error(f"Erreur pré-chauffage: {exc}")
+        time.sleep(PREWARM_INTERVAL_SECONDS)
+
+def start_prewarm_scheduler():
+    """Démarre le pré-chauffage (une fois par processus, après le fork gunicorn)."""
+    global _PREWARM_STARTED
+    if not PREWARM_ENABLED:
+        return
+    with _PREWARM_LOCK:
+        if _PREWARM_STARTED:
+            return
+        _PREWARM_STARTED = True
+    threading.Thread(target=prewarm_loop, name='prewarm', daemon=True).start()
+
+@app.before_request
+def ensure_prewarm_scheduler():
+    start_prewarm_scheduler()
+
+@app.before_request
+def start_request_timing():
+    if request.endpoint in TIMED_ENDPOINTS:
+        g.timing_token = REQUEST_TIMING.set(RequestTiming())
+
+@app.after_request
+def add_server_timing(response):
+    timing = REQUEST_TIMING.get()
+    if timing is not None:
+        response.headers['Server-Timing'] = timing.header()
+    return response
+
+@app.teardown_request
+def end_request_timing(exc=None):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        REQUEST_TIMING.reset(token)
+
+def timed_json(payload):
+    """jsonify mesuré ; avec debug=timing, le détail des étapes par cinéma est ajouté au payload."""
+    timing = REQUEST_TIMING.get()
+    if timing is not None and request.args.get('debug') == 'timing':
+        payload['timing'] = timing.as_dict()
+    with timed('serialize'):
+        return jsonify(payload)
+
+# Champs d'un film partagés par tous les cinémas (format normalisé)
+FILM_FIELDS = (
+    'title', 'director', 'duration', 'actors', 'poster_url', 'letterboxd_url',
+    'release_date', 'overview', 'vote_average', 'genres', 'tmdb_id',
+)
+# Champs propres à une séance d'un cinéma, répétés seulement s'ils diffèrent du film
+FILM_OVERRIDE_FIELDS = ('title', 'poster_url')
+SHOWTIMES_FORMATS = ('full', 'normalized')
+# Nombre maximum de jours pour /showtimes/range
+RANGE_MAX_DAYS = 14
+
+def film_key(movie):
+    """Clé stable d'un film : ID TMDB, sinon empreinte du titre normalisé."""
+    if movie.get('tmdb_id'):
+        return f"tmdb:{movie['tmdb_id']}"
+    return 'h:' + hashlib.sha1(normalize_key(movie['title']).encode('utf-8')).hexdigest()[:12]
+
+def normalize_showtimes(all_showtimes, films=None):
+    """Format normalisé : métadonnées des films une seule fois dans films, référencées par clé."""
+    films = {} if films is None else films
+    showtimes = {}
+    for cinema_name, movies in all_showtimes.items():
+        entries = []
+        for movie in movies_as_dicts(movies):
+            key = film_key(movie)
+            film = films.setdefault(key, {field: movie.get(field) for field in FILM_FIELDS})
+            entry = {'film': key, 'showtimes': movie['showtimes']}
+            for field in FILM_OVERRIDE_FIELDS:
+                if movie.get(field) != film.get(field):
+                    entry[field] = movie.get(field)
+            entries.append(entry)
+        showtimes[cinema_name] = entries
+    return films, showtimes
+
+def showtimes_payload(date_str, all_showtimes, response_format):
+    if response_format == 'normalized':
+        films, showtimes = normalize_showtimes(all_showtimes)
+        return {'date': date_str, 'films': films, 'showtimes': showtimes}
+    return {
+        'date': date_str,
+        'showtimes': {cinema_name: movies_as_dicts(movies) for cinema_name, movies in all_showtimes.items()},
+    }
+
 @app.route('/showtimes')
 def get_showtimes():
     """Récupère les horaires en scrapant Allociné et enrichit avec TMDB"""
-    date_param = request.args.get('date')
-    
-    if date_param:
-        try:
-            target_date = datetime.strptime(date_param, '%Y-%m-%d')
-        except ValueError:
-            return jsonify({'error': 'Format de date invalide'}), 400
-    else:
-        target_date = datetime.now()
-    
-    date_str = target_date.strftime('%Y-%m-%d')
-
-    # Cache hit
-    cached = SHOWTIMES_CACHE.get(date_str)
-    if cached:
-        cached_at, cached_data = cached
-        if time.time() - cached_at < SHOWTIMES_TTL_SECONDS:
-            return jsonify({
-                'date': date_str,
-                'showtimes': cached_data
-            })
+    try:
+        date_str = parse_date_param(request.args.get('date'))
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
 
-    all_showtimes = {}
+    cinemas, unknown = parse_cinemas_param(request.args.get('cinemas'))
+    if unknown:
+        return jsonify({'error': f"Cinéma(s) inconnu(s): {', '.join(unknown)}"}), 400
 
-    # Parallel scraping for faster response
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        future_map = {
-            executor.submit(scrape_allocine_showtimes, cinema_id, date_str): cinema_name
-            for cinema_name, cinema_id in CINEMA_IDS.items()
+    response_format = request.args.get('format', 'full')
+    if response_format not in SHOWTIMES_FORMATS:
+        return jsonify({'error': f"Format inconnu: {response_format}"}), 400
+
+    stale_ages = {}
+    all_showtimes = collect_showtimes(cinemas, date_str, stale_ages)
+
+    payload = showtimes_payload(date_str, all_showtimes, response_format)
+    if stale_ages:
+        # Horaires servis depuis une entrée périmée (rafraîchissement en cours) : âge en secondes
+        payload['stale'] = stale_ages
+    return timed_json(payload)
+
+@app.route('/showtimes/range')
+def get_showtimes_range():
+    """Horaires de plusieurs dates en une réponse (par défaut : aujourd'hui et les 6 jours suivants)"""
+    try:
+        from_str = parse_date_param(request.args.get('from'))
+        start_date = datetime.strptime(from_str, '%Y-%m-%d')
+        if request.args.get('to'):
+            end_date = datetime.strptime(request.args['to'], '%Y-%m-%d')
+        else:
+            end_date = start_date + timedelta(days=PREWARM_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+
+    day_count = (end_date - start_date).days + 1
+    if day_count < 1:
+        return jsonify({'error': "'to' doit être postérieur ou égal à 'from'"}), 400
+    if day_count > RANGE_MAX_DAYS:
+        return jsonify({'error': f'Intervalle limité à {RANGE_MAX_DAYS} jours'}), 400
+
+    cinemas, unknown = parse_cinemas_param(request.args.get('cinemas'))
+    if unknown:
+        return jsonify({'error': f"Cinéma(s) inconnu(s): {', '.join(unknown)}"}), 400
+
+    response_format = request.args.get('format', 'full')
+    if response_format not in SHOWTIMES_FORMATS:
+        return jsonify({'error': f"Format inconnu: {response_format}"}), 400
+
+    dates = [(start_date + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(day_count)]
+    stale_ages = {}
+    showtimes_by_date = collect_showtimes_range(cinemas, dates, stale_ages)
+
+    payload = {'from': dates[0], 'to': dates[-1]}
+    if response_format == 'normalized':
+        films = {}
+        payload['films'] = films
+        payload['dates'] = {
+            date_str: normalize_showtimes(all_showtimes, films)[1]
+            for date_str, all_showtimes in showtimes_by_date.items()
         }
-        for future in as_completed(future_map):
-            cinema_name = future_map[future]
-            try:
-                showtimes = future.result()
-            except Exception as exc:
-                logger.error(f"Erreur scraping {cinema_name}: {exc}")
-                showtimes = []
-            all_showtimes[cinema_name] = showtimes
+    else:
+        payload['dates'] = {
+            date_str: {cinema_name: movies_as_dicts(movies) for cinema_name, movies in all_showtimes.items()}
+            for date_str, all_showtimes in showtimes_by_date.items()
+        }
+    if stale_ages:
+        payload['stale'] = stale_ages
+    return timed_json(payload)
 
-    SHOWTIMES_CACHE[date_str] = (time.time(), all_showtimes)
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    return jsonify({
-        'date': date_str,
-        'showtimes': all_showtimes
+@app.route('/showtimes/stream')
+def stream_showtimes():
+    """Flux SSE : un événement 'cinema' dès qu'un cinéma est prêt, puis un événement 'done'"""
+    try:
+        date_str = parse_date_param(request.args.get('date'))
+    except ValueError:
+        return jsonify({'error': 'Format de date invalide'}), 400
+
+    cinemas, unknown = parse_cinemas_param(request.args.get('cinemas'))
+    if unknown:
+        return jsonify({'error': f"Cinéma(s) inconnu(s): {', '.join(unknown)}"}), 400
+
+    response_format = request.args.get('format', 'full')
+    if response_format not in SHOWTIMES_FORMATS:
+        return jsonify({'error': f"Format inconnu: {response_format}"}), 400
+
+    def cinema_event(cinema_name, movies, films_sent, stale_age=None):
+        if response_format != 'normalized':
+            data = {'cinema': cinema_name, 'showtimes': movies_as_dicts(movies)}
+        else:
+            films, showtimes = normalize_showtimes({cinema_name: movies})
+            # Chaque film n'est envoyé qu'une fois par flux
+            new_films = {key: film for key, film in films.items() if key not in films_sent}
+            films_sent.update(new_films)
+            data = {'cinema': cinema_name, 'films': new_films, 'showtimes': showtimes[cinema_name]}
+        if stale_age is not None:
+            data['stale'] = stale_age
+        return sse_event('cinema', data)
+
+    def generate():
+        started = time.time()
+        films_sent = {}
+        missing = {}
+        stale = []
+        now = time.time()
+        for cinema_name, cinema_id in cinemas.items():
+            cached = SHOWTIMES_CACHE.get((cinema_id, date_str))
+            if cached and now - cached[0] < SHOWTIMES_STALE_MAX_SECONDS:
+                stale_age = None
+                if now >= cached[1]:
+                    stale.append((cinema_id, date_str))
+                    stale_age = round(now - cached[0])
+                yield cinema_event(cinema_name, cached[2], films_sent, stale_age)
+            else:
+                missing[cinema_name] = cinema_id
+
+        if stale:
+            schedule_refresh(stale)
+
+        names = {(cinema_id, date_str): cinema_name for cinema_name, cinema_id in missing.items()}
+        for pair, showtimes in iter_refreshed_cinemas(list(names)):
+            yield cinema_event(names[pair], showtimes, films_sent)
+
+        yield sse_event('done', {
+            'date': date_str,
+            'cinemas': len(cinemas),
+            'cached': len(cinemas) - len(missing),
+            'scraped': len(missing),
+            'elapsed_ms': round((time.time() - started) * 1000),
+        })
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
 
+@app.route('/metrics')
+def metrics():
+    """Métriques au format texte Prometheus (propres à ce processus)."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/test-cinema/<cinema_name>')
 def test_cinema(cinema_name):
     """Teste un seul cinéma"""
@@ -582,12 +2674,12 @@ def test_cinema(cinema_name):
         return jsonify({'error': f'Cinéma {cinema_name} non trouvé'}), 404
     
     cinema_id = CINEMA_IDS[cinema_name]
-    showtimes = scrape_allocine_showtimes(cinema_id, datetime.now().strftime('%Y-%m-%d'))
+    showtimes = refresh_cinema(cinema_id, datetime.now().strftime('%Y-%m-%d'))
     
     return jsonify({
         'cinema': cinema_name,
         'cinema_id': cinema_id,
-        'showtimes': showtimes
+        'showtimes': movies_as_dicts(showtimes)
     })
 
 if __name__ == '__main__':
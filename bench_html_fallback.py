@@ -0,0 +1,94 @@
+"""Mesure le parsing du fallback HTML Allociné sur des pages enregistrées.
+
+Usage :
+    python bench_html_fallback.py --fetch C0073          # enregistre la page dans fixtures/html/
+    python bench_html_fallback.py fixtures/html/*.html   # compare les chemins de parsing
+"""
+import argparse
+import os
+import re
+import time
+
+os.environ.setdefault('SEANCES_CACHE_PATH', '')
+os.environ.setdefault('PREWARM_ENABLED', '0')
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import app  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'html')
+
+
+def fetch_fixture(cinema_id):
+    url = f"{app.ALLOCINE_BASE_URL}/seance/salle_gen_csalle={cinema_id}.html"
+    response = app.SESSION.get(url, headers=app.SESSION_HEADERS, timeout=10)
+    response.raise_for_status()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"{cinema_id}.html")
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    print(f"✓ {url} -> {path} ({len(response.content)} octets)")
+
+
+def parse_full_tree(content):
+    """Ancien chemin : arbre complet de la page, motif recompilé pour chaque carte."""
+    soup = BeautifulSoup(content, 'html.parser')
+    count = 0
+    for movie_div in soup.select('div.movie-card-theater'):
+        time_pattern = re.compile(r'\b(\d{1,2})[:h](\d{2})\b')
+        for span in movie_div.select('.showtimes-hour-item-value'):
+            time_pattern.search(span.get_text(strip=True))
+        count += 1
+    return count
+
+
+def available_parsers():
+    parsers = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+
+def bench(label, fn, runs):
+    fn()  # échauffement
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+    print(f"  {label:<32} {elapsed_ms:8.2f} ms/page  ({result} films)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='*', help='pages HTML enregistrées')
+    parser.add_argument('--fetch', metavar='CINEMA_ID', help='enregistre la page salle de ce cinéma')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_fixture(args.fetch)
+        return
+
+    paths = args.fixtures
+    if not paths and os.path.isdir(FIXTURES_DIR):
+        paths = [os.path.join(FIXTURES_DIR, name) for name in sorted(os.listdir(FIXTURES_DIR))]
+    if not paths:
+        parser.error("aucune page : passer des fichiers ou lancer --fetch CINEMA_ID")
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        print("=" * 60)
+        print(f"{os.path.basename(path)} ({len(content)} octets, {args.runs} passages)")
+        print("=" * 60)
+        bench('arbre complet (html.parser)', lambda: parse_full_tree(content), args.runs)
+        for name in available_parsers():
+            bench(f"cartes seules ({name})",
+                  lambda name=name: len(app.parse_allocine_showtimes_html(content, parser=name)), args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark de bout en bout de /showtimes, hors ligne, sur des réponses amont enregistrées.
+
+Usage :
+    python bench_showtimes.py --record --date 2026-01-17   # réseau réel, enregistre fixtures/http/
+    python bench_showtimes.py --date 2026-01-17            # rejeu hors ligne des fixtures
+
+Chaque passage part d'un cache persistant vide (fichier temporaire) et mesure :
+    froid           caches vides
+    redémarrage     cache mémoire vide, cache persistant chaud (redémarrage de worker)
+    chaud           cache mémoire chaud
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--date', required=True, help='date YYYY-MM-DD (celle des fixtures en rejeu)')
+    parser.add_argument('--cinemas', help='sous-ensemble, comme le paramètre cinemas= de /showtimes')
+    parser.add_argument('--record', action='store_true', help='appels réseau réels, réponses enregistrées')
+    parser.add_argument('--fixtures', help='répertoire des fixtures (défaut : fixtures/http)')
+    parser.add_argument('--runs', type=int, default=5, help='passages pour la mesure à chaud')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    cache_dir = tempfile.mkdtemp(prefix='seances-bench-')
+    # Configuration lue à l'import de app
+    os.environ['SEANCES_HTTP_MODE'] = 'record' if args.record else 'replay'
+    os.environ['SEANCES_CACHE_PATH'] = os.path.join(cache_dir, 'cache.sqlite3')
+    os.environ['PREWARM_ENABLED'] = '0'
+    if args.fixtures:
+        os.environ['SEANCES_FIXTURES_DIR'] = args.fixtures
+
+    import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    client = app.app.test_client()
+    url = f"/showtimes?date={args.date}"
+    if args.cinemas:
+        url += f"&cinemas={args.cinemas}"
+
+    def measure(label, runs=1):
+        calls_before = app.UPSTREAM_REQUESTS.total()
+        wall = cpu = 0.0
+        for _ in range(runs):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            response = client.get(url)
+            wall += time.perf_counter() - wall_start
+            cpu += time.process_time() - cpu_start
+            if response.status_code != 200:
+                sys.exit(f"{label}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+        data = response.get_json()
+        films = sum(len(movies) for movies in data['showtimes'].values())
+        calls = app.UPSTREAM_REQUESTS.total() - calls_before
+        print(f"{label:<14} {wall / runs * 1000:10.1f} {cpu / runs * 1000:10.1f} {calls:8d} {films:6d}")
+
+    print("=" * 60)
+    print(f"/showtimes {args.date} — mode {app.HTTP_MODE}, fixtures {app.HTTP_FIXTURES_DIR}")
+    print("=" * 60)
+    print(f"{'':<14} {'mur (ms)':>10} {'CPU (ms)':>10} {'appels':>8} {'films':>6}")
+    measure('froid')
+    app.SHOWTIMES_CACHE.clear()
+    measure('redémarrage')
+    measure('chaud', runs=args.runs)
+    print(f"\nAppels amont par hôte : {app.UPSTREAM_REQUESTS.values_by('host')}")
+
+
+if __name__ == '__main__':
+    main()
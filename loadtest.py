@@ -0,0 +1,87 @@
+"""Générateur de charge pour l'API : latences p50/p95/p99 et débit.
+
+Usage :
+    python loadtest.py --url http://127.0.0.1:5001 --concurrency 20 --duration 30
+    python loadtest.py --path "/showtimes?format=normalized" --days 7 --requests 500
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import requests
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--path', default='/showtimes', help='chemin interrogé (date ajoutée automatiquement)')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30, help='durée en secondes')
+    parser.add_argument('--requests', type=int, default=None, help='nombre total de requêtes (prioritaire sur --duration)')
+    parser.add_argument('--days', type=int, default=7, help='dates tirées parmi aujourd\'hui + N-1 jours')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    dates = [(datetime.now() + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(args.days)]
+    separator = '&' if '?' in args.path else '?'
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = [args.requests]
+    deadline = time.perf_counter() + args.duration
+
+    def take_slot():
+        with lock:
+            if remaining[0] is None:
+                return time.perf_counter() < deadline
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker():
+        session = requests.Session()
+        while take_slot():
+            url = f"{args.url}{args.path}{separator}date={random.choice(dates)}"
+            start = time.perf_counter()
+            try:
+                status = session.get(url, timeout=args.timeout).status_code
+            except requests.RequestException as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    print("=" * 60)
+    print(f"{args.url}{args.path} — {args.concurrency} clients, {len(latencies)} requêtes en {wall:.1f}s")
+    print("=" * 60)
+    print(f"Débit   : {len(latencies) / wall:.1f} req/s")
+    for pct in (50, 95, 99):
+        print(f"p{pct:<6} : {percentile(latencies, pct) * 1000:.0f} ms")
+    if latencies:
+        print(f"max     : {latencies[-1] * 1000:.0f} ms")
+    print(f"Statuts : {dict(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Serveurs amont simulés (Allociné + TMDB) avec latence et erreurs injectées.
+
+Usage :
+    python mock_upstream.py --allocine-latency fixed:3 --tmdb-429-rate 0.1
+
+puis lancer l'API pointée dessus :
+    ALLOCINE_BASE_URL=http://127.0.0.1:8001 TMDB_BASE_URL=http://127.0.0.1:8002/3 \\
+        gunicorn -w 4 -b 127.0.0.1:5001 app:app
+
+Latences (en secondes) : fixed:S, uniform:MIN:MAX, lognormal:MEDIANE:SIGMA, exp:MOYENNE.
+"""
+import argparse
+import hashlib
+import math
+import random
+import threading
+import time
+import unicodedata
+from datetime import datetime
+
+from flask import Flask, abort, jsonify, request
+from werkzeug.serving import make_server
+
+RESULTS_PER_PAGE = 8
+
+
+def parse_latency(spec):
+    """'lognormal:0.3:0.5' -> fonction sans argument renvoyant une latence en secondes."""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    if kind == 'exp':
+        return lambda: random.expovariate(1 / values[0])
+    raise argparse.ArgumentTypeError(f"latence inconnue: {spec}")
+
+
+def stable_int(*parts):
+    return int(hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()[:8], 16)
+
+
+def normalize(value):
+    value = unicodedata.normalize('NFD', value or '')
+    return ''.join(ch for ch in value if unicodedata.category(ch) != 'Mn').lower().strip()
+
+
+class Catalogue:
+    """Films synthétiques, programmés de façon déterministe par cinéma et par date."""
+
+    def __init__(self, size, films_per_cinema):
+        self.films_per_cinema = films_per_cinema
+        self.films = [
+            {
+                'allocine_id': 100000 + i,
+                'tmdb_id': 1000 + i,
+                'title': f"Film {i:03d}",
+                'year': 1950 + (i * 7) % 75,
+                'runtime': 80 + (i * 13) % 70,
+            }
+            for i in range(size)
+        ]
+        self.by_title = {normalize(film['title']): film for film in self.films}
+        self.by_tmdb_id = {film['tmdb_id']: film for film in self.films}
+
+    def programme(self, cinema_id, date_str):
+        start = stable_int(cinema_id, date_str) % len(self.films)
+        films = [self.films[(start + i) % len(self.films)] for i in range(self.films_per_cinema)]
+        programme = []
+        for film in films:
+            count = 1 + stable_int(film['title'], cinema_id, date_str) % 4
+            starts = sorted({f"{11 + (stable_int(film['title'], k) % 11):02d}:{(k * 15) % 60:02d}" for k in range(count)})
+            programme.append((film, starts))
+        return programme
+
+
+def create_allocine_app(args, catalogue):
+    app = Flask('mock_allocine')
+    latency = parse_latency(args.allocine_latency)
+
+    def simulate(error_rate):
+        time.sleep(latency())
+        if random.random() < error_rate:
+            abort(503)
+
+    def conditional(response):
+        # ETag sur le corps : un If-None-Match identique reçoit un 304 sans corps
+        if args.etag:
+            response.add_etag()
+            response.make_conditional(request)
+        return response
+
+    @app.route('/_/showtimes/theater-<cinema_id>/d-<date_str>/p-<int:page>')
+    def showtimes_json(cinema_id, date_str, page):
+        simulate(args.allocine_json_error_rate)
+        programme = catalogue.programme(cinema_id, date_str)
+        total_pages = max(1, math.ceil(len(programme) / RESULTS_PER_PAGE))
+        chunk = programme[(page - 1) * RESULTS_PER_PAGE:page * RESULTS_PER_PAGE]
+        return conditional(jsonify({
+            'pagination': {'page': page, 'totalPages': total_pages},
+            'results': [
+                {
+                    'movie': {
+                        'internalId': film['allocine_id'],
+                        'title': film['title'],
+                        'productionYear': film['year'],
+                        'poster': {'url': f"https://fr.web.img.acsta.net/pictures/{film['allocine_id']}.jpg"},
+                    },
+                    'showtimes': {'original': [{'startsAt': f"{date_str}T{start}:00"} for start in starts]},
+                }
+                for film, starts in chunk
+            ],
+        }))
+
+    @app.route('/seance/salle_gen_csalle=<cinema_id>.html')
+    def showtimes_html(cinema_id):
+        simulate(args.allocine_html_error_rate)
+        cards = []
+        for film, starts in catalogue.programme(cinema_id, datetime.now().strftime('%Y-%m-%d')):
+            hours = ''.join(f'<span class="showtimes-hour-item-value">{start}</span>' for start in starts)
+            cards.append(
+                f'<div class="card entity-card movie-card-theater cf">'
+                f'<img class="thumbnail-img" data-src="https://fr.web.img.acsta.net/pictures/{film["allocine_id"]}.jpg">'
+                f'<h2 class="meta-title"><a class="meta-title-link" href="/film/fichefilm_gen_cfilm={film["allocine_id"]}.html">'
+                f'{film["title"]}</a></h2><div class="showtimes-hours">{hours}</div></div>'
+            )
+        return conditional(app.make_response(f"<html><body>{''.join(cards)}</body></html>"))
+
+    return app
+
+
+def create_tmdb_app(args, catalogue):
+    app = Flask('mock_tmdb')
+    latency = parse_latency(args.tmdb_latency)
+
+    def simulate():
+        time.sleep(latency())
+        roll = random.random()
+        if roll < args.tmdb_429_rate:
+            response = jsonify({'status_code': 25, 'status_message': 'Rate limit'})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(args.retry_after)
+            return response
+        if roll < args.tmdb_429_rate + args.tmdb_error_rate:
+            abort(503)
+        return None
+
+    @app.route('/3/search/movie')
+    def search_movie():
+        throttled = simulate()
+        if throttled is not None:
+            return throttled
+        film = catalogue.by_title.get(normalize(request.args.get('query')))
+        results = []
+        if film:
+            results.append({
+                'id': film['tmdb_id'],
+                'title': film['title'],
+                'original_title': film['title'],
+                'original_language': 'fr',
+                'release_date': f"{film['year']}-01-01",
+            })
+        return jsonify({'page': 1, 'results': results, 'total_results': len(results)})
+
+    @app.route('/3/movie/<int:tmdb_id>')
+    def movie_details(tmdb_id):
+        throttled = simulate()
+        if throttled is not None:
+            return throttled
+        film = catalogue.by_tmdb_id.get(tmdb_id)
+        if not film:
+            abort(404)
+        return jsonify({
+            'id': tmdb_id,
+            'title': film['title'],
+            'original_language': 'fr',
+            'runtime': film['runtime'],
+            'release_date': f"{film['year']}-01-01",
+            'overview': f"Résumé de {film['title']}.",
+            'vote_average': round(5 + (tmdb_id % 50) / 10, 1),
+            'genres': [{'id': 18, 'name': 'Drame'}],
+            'poster_path': f"/{tmdb_id}.jpg",
+            'credits': {
+                'crew': [{'job': 'Director', 'name': f"Réalisateur {tmdb_id}"}],
+                'cast': [{'name': f"Acteur {tmdb_id}-{k}"} for k in range(5)],
+            },
+            'images': {'posters': [{'iso_639_1': 'fr', 'file_path': f"/{tmdb_id}-fr.jpg", 'vote_count': 1}]},
+        })
+
+    return app
+
+
+def serve(app, host, port):
+    server = make_server(host, port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--allocine-port', type=int, default=8001)
+    parser.add_argument('--tmdb-port', type=int, default=8002)
+    parser.add_argument('--allocine-latency', default='lognormal:0.15:0.5')
+    parser.add_argument('--tmdb-latency', default='lognormal:0.08:0.5')
+    parser.add_argument('--allocine-json-error-rate', type=float, default=0.0, help='part de 503 sur le JSON')
+    parser.add_argument('--allocine-html-error-rate', type=float, default=0.0, help='part de 503 sur la page HTML')
+    parser.add_argument('--tmdb-429-rate', type=float, default=0.0, help='part de 429 sur TMDB')
+    parser.add_argument('--tmdb-error-rate', type=float, default=0.0, help='part de 503 sur TMDB')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After des 429 (secondes)')
+    parser.add_argument('--no-etag', dest='etag', action='store_false', help='pas d\'ETag ni de 304 côté Allociné')
+    parser.add_argument('--films', type=int, default=60, help='taille du catalogue')
+    parser.add_argument('--films-per-cinema', type=int, default=14)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    parse_latency(args.allocine_latency)
+    parse_latency(args.tmdb_latency)
+    random.seed(args.seed)
+    catalogue = Catalogue(args.films, args.films_per_cinema)
+
+    serve(create_allocine_app(args, catalogue), args.host, args.allocine_port)
+    serve(create_tmdb_app(args, catalogue), args.host, args.tmdb_port)
+    print(f"Allociné simulé : http://{args.host}:{args.allocine_port}  (latence {args.allocine_latency})")
+    print(f"TMDB simulé     : http://{args.host}:{args.tmdb_port}/3  (latence {args.tmdb_latency})")
+    print(f"\nALLOCINE_BASE_URL=http://{args.host}:{args.allocine_port} "
+          f"TMDB_BASE_URL=http://{args.host}:{args.tmdb_port}/3 gunicorn -w 4 -b 127.0.0.1:5001 app:app")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Environnement des tests : cache SQLite jetable et amont simulé (mock_upstream), configurés avant l'import d'app."""
+import itertools
+import os
+import socket
+import sys
+import tempfile
+from argparse import Namespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock_upstream  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+ALLOCINE_PORT = free_port()
+TMDB_PORT = free_port()
+MOCK_ARGS = Namespace(
+    allocine_latency='fixed:0.3',
+    tmdb_latency='fixed:0.01',
+    allocine_json_error_rate=0.0,
+    allocine_html_error_rate=0.0,
+    tmdb_429_rate=0.0,
+    tmdb_error_rate=0.0,
+    retry_after=1,
+    etag=True,
+)
+CATALOGUE = mock_upstream.Catalogue(size=30, films_per_cinema=4)
+
+os.environ['SEANCES_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='seances-tests-'), 'cache.sqlite3')
+os.environ['PREWARM_ENABLED'] = '0'
+os.environ['ALLOCINE_BASE_URL'] = f"http://127.0.0.1:{ALLOCINE_PORT}"
+os.environ['TMDB_BASE_URL'] = f"http://127.0.0.1:{TMDB_PORT}/3"
+
+mock_upstream.serve(mock_upstream.create_allocine_app(MOCK_ARGS, CATALOGUE), '127.0.0.1', ALLOCINE_PORT)
+mock_upstream.serve(mock_upstream.create_tmdb_app(MOCK_ARGS, CATALOGUE), '127.0.0.1', TMDB_PORT)
+
+import app as seances  # noqa: E402
+
+# Pas de bridage de débit vers l'amont local
+seances.HOST_LIMITS[f"127.0.0.1:{ALLOCINE_PORT}"] = (1000.0, 32)
+seances.HOST_LIMITS[f"127.0.0.1:{TMDB_PORT}"] = (1000.0, 32)
+
+_HOSTS = itertools.count()
+
+
+@pytest.fixture
+def url(monkeypatch):
+    """URL d'un hôte neuf (disjoncteur et limiteur propres au test), sans backoff entre retries."""
+    monkeypatch.setattr(seances, 'HTTP_RETRY_BACKOFF_SECONDS', 0)
+    return f"http://host-{next(_HOSTS)}.test/movie"
+
+
+def fake_session_get(monkeypatch, *outcomes):
+    """session_get renvoie (ou lève) chaque issue tour à tour, la dernière indéfiniment."""
+    calls = []
+
+    def session_get(url, params=None, timeout=10, headers=None):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(url)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return seances.CachedResponse(url, outcome, '{}', {'Retry-After': '0'})
+
+    monkeypatch.setattr(seances, 'session_get', session_get)
+    return calls
@@ -0,0 +1,97 @@
+"""Disjoncteur par hôte : fermé -> ouvert -> semi-ouvert -> fermé, y compris via send_with_retries."""
+import pytest
+import requests
+
+import app as seances
+from conftest import fake_session_get
+
+def open_breaker(url):
+    breaker = seances.circuit_breaker_for(url)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def age(breaker):
+    breaker.opened_at -= breaker.reset_seconds
+
+
+def test_breaker_transitions(url):
+    breaker = seances.circuit_breaker_for(url)
+    for _ in range(breaker.failure_threshold - 1):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    age(breaker)
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    # Une seule requête d'essai à la fois
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_probe_reopens(url):
+    breaker = open_breaker(url)
+    age(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+
+def test_open_breaker_fails_fast(url, monkeypatch):
+    calls = fake_session_get(monkeypatch, 200)
+    open_breaker(url)
+    with pytest.raises(seances.CircuitOpenError):
+        seances.send_with_retries(url)
+    assert calls == []
+
+
+def test_successful_probe_closes_through_send(url, monkeypatch):
+    fake_session_get(monkeypatch, 200)
+    breaker = open_breaker(url)
+    age(breaker)
+    assert seances.send_with_retries(url).status_code == 200
+    assert breaker.state == 'closed'
+
+
+@pytest.mark.parametrize('error', [
+    requests.exceptions.ChunkedEncodingError('connexion coupée'),
+    requests.exceptions.ContentDecodingError('gzip invalide'),
+    requests.exceptions.InvalidURL('url invalide'),
+])
+def test_probe_request_exception_reopens(url, monkeypatch, error):
+    calls = fake_session_get(monkeypatch, error)
+    breaker = open_breaker(url)
+    age(breaker)
+    # Essai échoué : circuit rouvert, le retry suivant est refusé sans appel
+    with pytest.raises(seances.CircuitOpenError):
+        seances.send_with_retries(url)
+    assert len(calls) == 1
+    assert breaker.state == 'open'
+    age(breaker)
+    assert breaker.allow()
+
+
+def test_probe_local_error_releases_probe(url, monkeypatch):
+    fake_session_get(monkeypatch, OSError('disque plein'))
+    breaker = open_breaker(url)
+    age(breaker)
+    with pytest.raises(OSError):
+        seances.send_with_retries(url)
+    assert breaker.allow()
+
+
+def test_throttled_probe_releases_probe(url, monkeypatch):
+    calls = fake_session_get(monkeypatch, 429)
+    breaker = open_breaker(url)
+    age(breaker)
+    assert seances.send_with_retries(url).status_code == 429
+    assert len(calls) == seances.HTTP_MAX_RETRIES + 1
+    # Un 429 n'est ni succès ni panne : le circuit reste semi-ouvert et accepte un nouvel essai
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
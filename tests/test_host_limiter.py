@@ -0,0 +1,87 @@
+"""Limiteur par hôte : créneau toujours rendu, échec immédiat quand aucun ne peut se libérer à temps."""
+import time
+
+import pytest
+import requests
+
+import app as seances
+from conftest import fake_session_get
+
+
+@pytest.mark.parametrize('error', [
+    requests.exceptions.ChunkedEncodingError('connexion coupée'),
+    requests.exceptions.ContentDecodingError('gzip invalide'),
+    requests.exceptions.InvalidURL('url invalide'),
+    OSError('disque plein'),
+])
+def test_slot_released_on_error(url, monkeypatch, error):
+    fake_session_get(monkeypatch, error)
+    limiter = seances.host_limiter_for(url)
+    for _ in range(limiter.max_concurrency + 1):
+        with pytest.raises((type(error), seances.CircuitOpenError)):
+            seances.send_with_retries(url)
+        assert limiter.in_flight == 0
+        seances.circuit_breaker_for(url).record_success()
+
+
+@pytest.mark.parametrize('status', [200, 404, 429, 503])
+def test_slot_released_on_response(url, monkeypatch, status):
+    fake_session_get(monkeypatch, status)
+    limiter = seances.host_limiter_for(url)
+    assert seances.send_with_retries(url).status_code == status
+    assert limiter.in_flight == 0
+
+
+def test_slot_released_when_circuit_open(url, monkeypatch):
+    fake_session_get(monkeypatch, 200)
+    breaker = seances.circuit_breaker_for(url)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with pytest.raises(seances.CircuitOpenError):
+        seances.send_with_retries(url)
+    assert seances.host_limiter_for(url).in_flight == 0
+
+
+def test_throttled_response_halves_limits(url, monkeypatch):
+    fake_session_get(monkeypatch, 429, 200)
+    limiter = seances.host_limiter_for(url)
+    assert seances.send_with_retries(url).status_code == 200
+    assert limiter.concurrency < limiter.max_concurrency
+    assert limiter.rate < limiter.max_rate
+
+
+def test_block_past_deadline_fails_fast(url):
+    limiter = seances.host_limiter_for(url)
+    limiter.block(60)
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=2)
+    assert time.monotonic() - start < 0.1
+
+
+def test_short_block_is_waited(url):
+    limiter = seances.host_limiter_for(url)
+    limiter.block(0.2)
+    start = time.monotonic()
+    assert limiter.acquire(timeout=2)
+    assert 0.15 < time.monotonic() - start < 1
+    limiter.release()
+
+
+def test_token_wait_past_deadline_fails_fast(url):
+    limiter = seances.host_limiter_for(url)
+    limiter.rate = limiter.min_rate
+    limiter.tokens = 0
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0.1)
+    assert time.monotonic() - start < 0.05
+
+
+def test_blocked_host_serves_expired_cache(url, monkeypatch):
+    calls = fake_session_get(monkeypatch, 200)
+    key = seances.http_cache_key(url)
+    seances.PERSISTENT_CACHE.set('http', key, {'url': url, 'status_code': 200, 'text': '"en cache"'}, -1)
+    seances.host_limiter_for(url).block(60)
+    start = time.monotonic()
+    assert seances.http_get(url, cache_ttl=60).json() == 'en cache'
+    assert time.monotonic() - start < 0.5
+    assert calls == []
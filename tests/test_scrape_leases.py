@@ -0,0 +1,77 @@
+"""Baux de scrape partagés : un flux SSE et /showtimes concurrents sur un cache froid."""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import app as seances
+
+# Au moins deux fois plus de cinémas que de threads dans SCRAPE_EXECUTOR : des scrapes restent en file
+CINEMAS = list(seances.CINEMA_IDS)
+DEADLINE_SECONDS = 30
+
+
+def get(path, results, key):
+    start = time.perf_counter()
+    response = seances.app.test_client().get(path)
+    results[key] = (response.status_code, response.get_data(as_text=True), time.perf_counter() - start)
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_stream_and_showtimes_share_leases_without_stalling():
+    date_str = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    query = f"date={date_str}&cinemas={','.join(CINEMAS)}"
+    results = {}
+    stream = threading.Thread(target=get, args=(f"/showtimes/stream?{query}", results, 'stream'))
+    showtimes = threading.Thread(target=get, args=(f"/showtimes?{query}", results, 'showtimes'))
+    stream.start()
+    # Le flux a pris ses premiers baux ; /showtimes prend les autres
+    time.sleep(0.1)
+    showtimes.start()
+    stream.join(DEADLINE_SECONDS)
+    showtimes.join(DEADLINE_SECONDS)
+
+    assert set(results) == {'stream', 'showtimes'}, 'une requête attend encore un bail'
+    status, body, elapsed = results['showtimes']
+    assert status == 200 and elapsed < DEADLINE_SECONDS
+    assert set(json.loads(body)['showtimes']) == set(CINEMAS)
+    assert all(json.loads(body)['showtimes'].values())
+
+    status, body, elapsed = results['stream']
+    assert status == 200 and elapsed < DEADLINE_SECONDS
+    events = sse_events(body)
+    assert [event for event, _ in events][-1] == 'done'
+    streamed = {data['cinema']: data['showtimes'] for event, data in events if event == 'cinema'}
+    assert set(streamed) == set(CINEMAS)
+    assert all(streamed.values())
+
+
+def test_failed_scrape_extends_entry_for_waiters():
+    pair = ('C_ECHEC', (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d'))
+    lease = seances.scrape_lease_name(pair)
+    movies = [seances.MovieShowtimes('Film', None, None, [seances.parse_minutes('20:30')])]
+    seances.SHOWTIMES_CACHE.put(pair, movies, -1)
+    stored_at = seances.SHOWTIMES_CACHE.get(pair)[0]
+    since = time.time()
+
+    # Un autre worker tient le bail et son scrape échoue (aucune source ne répond)
+    assert seances.PERSISTENT_CACHE.try_lease(lease, 'autre-worker', seances.SCRAPE_LEASE_SECONDS)
+    assert seances.store_cinema_showtimes(pair, None, {}) is movies
+    seances.PERSISTENT_CACHE.release_lease(lease, 'autre-worker')
+
+    results = {}
+    owned, waiting = seances.poll_scrapes([pair], since, results)
+    # L'attente prend l'entrée prolongée au lieu de reprendre le bail et de rescraper
+    assert owned == [] and waiting == []
+    assert results[pair] == movies
+    assert seances.PERSISTENT_CACHE.lease_expires_at(lease) is None
+    cached = seances.SHOWTIMES_CACHE.get(pair)
+    assert cached[0] == stored_at
+    assert cached[1] > time.time()
@@ -0,0 +1,52 @@
+"""Route Allociné par cinéma : seuls les essais du jour font changer de source."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as seances
+
+HTML_MOVIES = [{'title': 'Film', 'start_times': ['20:30'], 'year_hint': None, 'poster_url': None}]
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """JSON vide (cas du Louxor), page HTML avec des films ; journal des appels par source."""
+    calls = []
+
+    def fetch_json(cinema_id, date_str):
+        calls.append(('json', date_str))
+        return []
+
+    def fetch_html(cinema_id):
+        calls.append(('html', datetime.now().strftime('%Y-%m-%d')))
+        return HTML_MOVIES
+
+    monkeypatch.setattr(seances, 'fetch_allocine_showtimes_json', fetch_json)
+    monkeypatch.setattr(seances, 'fetch_allocine_showtimes_html', fetch_html)
+    return calls
+
+
+def test_other_dates_keep_html_route(sources):
+    cinema_id = 'C_JSON_VIDE'
+    today = datetime.now().strftime('%Y-%m-%d')
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    health = seances.source_health_for(cinema_id)
+    assert health.route() == 'race'
+
+    assert seances.fetch_allocine_movies(cinema_id, today) == HTML_MOVIES
+    assert health.route() == 'html'
+
+    # Le pré-chauffage des autres dates passe par le JSON (vide) sans changer la route du jour
+    assert seances.fetch_allocine_movies(cinema_id, tomorrow) == []
+    assert health.route() == 'html'
+
+    sources.clear()
+    assert seances.fetch_allocine_movies(cinema_id, today) == HTML_MOVIES
+    assert sources == [('html', today)]
+
+
+def test_empty_json_today_is_not_a_working_source(sources):
+    cinema_id = 'C_JSON_VIDE_2'
+    today = datetime.now().strftime('%Y-%m-%d')
+    seances.fetch_from_source('json', cinema_id, today)
+    assert seances.source_health_for(cinema_id).produced == {'json': False}
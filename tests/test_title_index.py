@@ -0,0 +1,53 @@
+"""Index local des titres : correspondances exactes, remakes et suites."""
+import pytest
+
+import app as seances
+
+
+@pytest.fixture
+def index():
+    index = seances.TitleIndex(seances.PersistentCache(''))
+    index.add(101, ['Saw II'], year='2005', original_language='en')
+    index.add(201, ['Paranormal Activity 2'], year='2010', original_language='en')
+    index.add(301, ['Suspiria'], year='1977', original_language='it')
+    index.add(302, ['Suspiria'], year='2018', original_language='en')
+    index.add(401, ['Le Fabuleux Destin d\'Amélie Poulain', 'Amélie'], year='2001', original_language='fr')
+    index.add(501, ['Toy Story 3'], year='2010', original_language='en')
+    return index
+
+
+def test_exact_title(index):
+    assert index.lookup('Saw II', 2005) == (101, 'en')
+    assert index.lookup('saw ii') == (101, 'en')
+    assert index.lookup('Amélie', 2001) == (401, 'fr')
+
+
+def test_remake_needs_year(index):
+    assert index.lookup('Suspiria') is None
+    assert index.lookup('Suspiria', 1977) == (301, 'it')
+    assert index.lookup('Suspiria', 2018) == (302, 'en')
+
+
+def test_close_variant(index):
+    assert index.lookup('Le fabuleux destin d Amelie Poulin', 2001) == (401, 'fr')
+    assert index.lookup('Toy Stori 3', 2010) == (501, 'en')
+
+
+@pytest.mark.parametrize('title, year', [
+    ('Saw III', 2006),
+    ('Saw 3', 2006),
+    ('Saw', 2004),
+    ('Paranormal Activity 3', 2011),
+    ('Paranormal Activity', 2009),
+    ('Toy Story 4', 2010),
+])
+def test_sequel_is_not_a_variant(index, title, year):
+    assert index.lookup(title, year) is None
+
+
+def test_sequel_numbers():
+    key = seances.TitleIndex.title_key
+    assert seances.TitleIndex.sequel_numbers(key('Saw III')) == {3}
+    assert seances.TitleIndex.sequel_numbers(key('Rocky IV')) == {4}
+    assert seances.TitleIndex.sequel_numbers(key('Blade Runner 2049')) == {2049}
+    assert seances.TitleIndex.sequel_numbers(key('Les Misérables')) == set()